@@ -1,20 +1,180 @@
 # Set of generic classes for general use in Artificial Chemistries
 
+from collections import Counter, deque
+import numbers
+import os
+import random
+from types import MappingProxyType
+
 import metachem.CoreNode as CoreNode
+import numpy as np
 import pandas as pd
 
+# Array names used in DiskLogEnvironment chunks besides the columns themselves.
+CHUNK_COLUMNS = "__columns__"
+CHUNK_OFFSETS = "__offsets__"
+
 # Basic containers using lists/nested lists
 
 
+class IndexedList(list):
+    """
+    List which keeps a map from the identity of each item to its positions so an item can be removed in constant time
+    by moving the last item into its place. Removal does not preserve order. Items must only be added and removed
+    through append, extend and remove so the map stays correct.
+
+    Parameters
+    ----------
+    items : iterable
+        Initial contents.
+    """
+
+    def __init__(self, items=()):
+        super(IndexedList, self).__init__(items)
+        self.positions = {}
+        for position, item in enumerate(self):
+            self.positions.setdefault(id(item), []).append(position)
+
+    def append(self, item):
+        self.positions.setdefault(id(item), []).append(len(self))
+        super(IndexedList, self).append(item)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def remove(self, item):
+        """
+        Removes the item, found by identity or failing that by equality as list.remove does.
+
+        Raises
+        ------
+        ValueError
+            Raised if the item is not in the list.
+        """
+        slots = self.positions.get(id(item))
+        if slots:
+            position = slots.pop()
+        else:
+            position = self.index(item)
+            slots = self.positions[id(self[position])]
+            slots.remove(position)
+        if not slots:
+            del self.positions[id(self[position])]
+        last = super(IndexedList, self).pop()
+        if position < len(self):
+            last_slots = self.positions[id(last)]
+            last_slots[last_slots.index(len(self))] = position
+            super(IndexedList, self).__setitem__(position, last)
+
+    def __reduce_ex__(self, protocol):
+        # identities are not kept by pickling so the map is rebuilt on load
+        return IndexedList, (list(self),)
+
+
+def remove_all(storage, items):
+    """
+    Removes items from a list in place with the same result as calling list.remove for each of them, but in a single
+    pass over the list. Indexed lists and lists holding unhashable items are handled item by item.
+
+    Parameters
+    ----------
+    storage : list
+        List the items are removed from.
+    items : list
+        Items to remove, each removes one matching entry.
+
+    Raises
+    ------
+    ValueError
+        Raised if an item is not in the list, in which case the list is unchanged.
+    """
+    if isinstance(storage, IndexedList) or len(items) < 2:
+        for item in items:
+            storage.remove(item)
+        return storage
+    try:
+        counts = Counter(items)
+        kept = []
+        for item in storage:
+            if counts.get(item):
+                counts[item] -= 1
+            else:
+                kept.append(item)
+    except TypeError:
+        for item in items:
+            storage.remove(item)
+        return storage
+    if any(counts.values()):
+        raise ValueError("list.remove(x): x not in list")
+    storage[:] = kept
+    return storage
+
+
+def swap_sample(storage, k, rng=random):
+    """
+    Removes k items chosen uniformly at random without replacement from an IndexedList and returns them, in the order
+    drawn. Each item is removed by moving the last item into its place, so the cost depends only on k but the order of
+    the list is not preserved. Lists whose order matters use ordered_sample.
+
+    Parameters
+    ----------
+    storage : IndexedList
+        List the items are removed from.
+    k : int
+        Number of items, all items are removed if there are fewer than k.
+    rng : random.Random
+        Random number generator used for the choice.
+    """
+    sample = [storage[i] for i in rng.sample(range(len(storage)), min(k, len(storage)))]
+    for item in sample:
+        storage.remove(item)
+    return sample
+
+
+def move_list(source, other):
+    """
+    Moves the list of a ListTank or ListSample to another container. The source is given a new empty list. If the
+    other container is an empty ListTank or ListSample expecting the same kind of list it takes over the list itself,
+    otherwise the list is handed to its add.
+    """
+    storage = source.list
+    indexed = isinstance(storage, IndexedList)
+    source.list = IndexedList() if indexed else []
+    if type(other) in (ListTank, ListSample) and not other.list and indexed == getattr(other, "indexed", False):
+        other.list = storage
+    else:
+        other.add(storage)
+
+
+def ordered_sample(storage, k, rng=random):
+    """
+    As swap_sample but deletes the items in place, preserving the order of the remaining items. Used for plain lists,
+    stacks and queues.
+    """
+    chosen = rng.sample(range(len(storage)), min(k, len(storage)))
+    sample = [storage[i] for i in chosen]
+    for index in sorted(chosen, reverse=True):
+        del storage[index]
+    return sample
+
+
 class ListTank(CoreNode.Tank):
     """
     Tank which stores particles in a list.
 
+    Parameters
+    ----------
+    indexed : Boolean
+        Stores the particles in an IndexedList so removal takes constant time, at the cost of the tank order changing
+        on removal. Suitable for well mixed tanks where order has no meaning.
+
     """
 
-    def __init__(self, graph):
+    def __init__(self, graph, indexed=False):
         super(ListTank, self).__init__(graph)
         self.list = None
+        self.indexed = indexed
         pass
 
     def read(self):
@@ -32,9 +192,22 @@ class ListTank(CoreNode.Tank):
         else:
             return self.list
 
+    def view(self):
+        """
+        Returns the tank list without copying, must not be modified.
+
+        Returns
+        -------
+        list: List<>
+            List of particles
+
+        """
+        return self.list if self.list is not None else []
+
     def add(self, particles=None):
         """
-        Adds particles to end of tank list.
+        Adds particles to end of tank list. The list is extended in place, a list of particles added to an empty tank
+        is copied so the tank never shares storage with the caller.
 
         Parameters
         ----------
@@ -47,15 +220,46 @@ class ListTank(CoreNode.Tank):
 
         """
         if self.list:
-            # print len(particles.rst)
-            self.list = self.list + particles
+            if isinstance(particles, list):
+                self.list.extend(particles)
+            else:
+                self.list.append(particles)
         elif isinstance(particles, list):
-            self.list = particles
+            self.list = IndexedList(particles) if self.indexed else particles[:]
         else:
-            self.list = [particles]
-        # print len(self.list)
+            self.list = IndexedList([particles]) if self.indexed else [particles]
         return self.list
 
+    def sample_and_remove(self, k, rng=random):
+        """
+        Removes k particles chosen uniformly at random and returns them. An indexed tank takes time proportional to k
+        and does not preserve the order of the tank, see swap_sample, otherwise the order is preserved.
+
+        Parameters
+        ----------
+        k : int
+            Number of particles to sample.
+        rng : random.Random
+            Random number generator used for the choice.
+
+        Returns
+        -------
+        List<Particle>
+            The removed particles.
+        """
+        if not self.list:
+            return []
+        return swap_sample(self.list, k, rng) if self.indexed else ordered_sample(self.list, k, rng)
+
+    def move_all_to(self, other):
+        """
+        Moves all particles to another container, handing over the list itself where possible, see move_list.
+        """
+        if isinstance(self.list, list) and self.list:
+            move_list(self, other)
+        else:
+            super(ListTank, self).move_all_to(other)
+
     def remove(self, particles=None):
         """
         Removes the listed particles from the tank.
@@ -77,7 +281,7 @@ class ListTank(CoreNode.Tank):
         elif not isinstance(particles, list):
             self.list.remove(particles)
         elif self.list:
-            [self.list.remove(part) for part in particles]
+            remove_all(self.list, particles)
         return self.list
 
 
@@ -104,9 +308,22 @@ class ListSample(CoreNode.Sample):
         """
         return self.list[:]
 
+    def view(self):
+        """
+        Returns the sample list without copying, must not be modified.
+
+        Returns
+        -------
+        list: List<>
+            List of particles
+
+        """
+        return self.list
+
     def add(self, particles=None):
         """
-        Adds particles to end of sample list.
+        Adds particles to end of sample list. The list is extended in place, a list of particles added to an empty
+        sample is copied so the sample never shares storage with the caller.
 
         Parameters
         ----------
@@ -119,18 +336,44 @@ class ListSample(CoreNode.Sample):
 
         """
         if self.list:
-            # print len(particles.rst)
             if isinstance(particles, list):
-                self.list = self.list + particles
+                self.list.extend(particles)
             else:
                 self.list.append(particles)
         elif isinstance(particles, list):
-            self.list = particles
+            self.list = particles[:]
         else:
             self.list = [particles]
-        # print len(self.list)
         return self.list
 
+    def sample_and_remove(self, k, rng=random):
+        """
+        Removes k particles chosen uniformly at random and returns them, the order of the remaining particles is
+        preserved.
+
+        Parameters
+        ----------
+        k : int
+            Number of particles to sample.
+        rng : random.Random
+            Random number generator used for the choice.
+
+        Returns
+        -------
+        List<Particle>
+            The removed particles.
+        """
+        return ordered_sample(self.list, k, rng) if self.list else []
+
+    def move_all_to(self, other):
+        """
+        Moves all particles to another container, handing over the list itself where possible, see move_list.
+        """
+        if isinstance(self.list, list) and self.list:
+            move_list(self, other)
+        else:
+            super(ListSample, self).move_all_to(other)
+
     def remove(self, particles=None):
         """
         Removes the listed particles from the sample.
@@ -150,7 +393,7 @@ class ListSample(CoreNode.Sample):
         elif not isinstance(particles, list):
             self.list.remove(particles)
         else:
-            [self.list.remove(part) for part in particles]
+            remove_all(self.list, particles)
         return self.list
 
 
@@ -177,6 +420,18 @@ class ListEnvironment(CoreNode.Environment):
         """
         return self.list[:]
 
+    def view(self):
+        """
+        Returns the environment list without copying, must not be modified.
+
+        Returns
+        -------
+        list: List<>
+            List of variables
+
+        """
+        return self.list
+
     def add(self, variables=None):
         """
         Adds variables to end of environment list.
@@ -222,26 +477,45 @@ class ListEnvironment(CoreNode.Environment):
 
 class StackTank(ListTank):
     """
-    A tank which uses a stack for storage of particles.
+    A tank which uses a stack for storage of particles. Stored in a deque so adding and removing take constant time.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of particles held, once full pushing onto the stack drops particles from the bottom. None for
+        no limit.
     """
 
-    def __init__(self, graph):
+    def __init__(self, graph, capacity=None):
         super(StackTank, self).__init__(graph)
+        self.capacity = capacity
+        self.list = deque(maxlen=capacity)
 
     def read(self):
         """
-        Returns a full copy of the tank.
+        Returns a full copy of the tank, an empty list if the tank is empty, including one never added to.
 
         Returns
         -------
         List<Particle>
 
         """
-        return super(StackTank, self).read()
+        return list(self.list)
+
+    def view(self):
+        """
+        Returns the deque without copying, must not be modified.
+
+        Returns
+        -------
+        deque<Particle>
+
+        """
+        return self.list
 
     def add(self, particles=None):
         """
-        Pushes list of particles onto the top of the tank stack.
+        Pushes list of particles onto the top of the tank stack, the first of the list ends up on top.
 
         Parameters
         ----------
@@ -253,16 +527,19 @@ class StackTank(ListTank):
         Returns storage to confirm successful change.
 
         """
-        if self.list:
-            # print len(particles.rst)
-            self.list = particles + self.list
-        elif isinstance(particles, list):
-            self.list = particles
+        if isinstance(particles, list):
+            self.list.extendleft(reversed(particles))
         else:
-            self.list = [particles]
-        # print len(self.list)
+            self.list.appendleft(particles)
         return self.list
 
+    def sample_and_remove(self, k, rng=random):
+        """
+        Removes k particles chosen uniformly at random and returns them, the order of the remaining particles is
+        preserved.
+        """
+        return ordered_sample(self.list, k, rng)
+
     def remove(self, particles=None):
         """
         The length n of the particle list is used to pop the top n particles from the stack, removing them from the
@@ -278,22 +555,27 @@ class StackTank(ListTank):
         Returns storage to confirm successful change.
 
         """
-        # print self.list
-        # print particles.rst
-        if isinstance(particles, list):
-            self.list = self.list[len(particles):]
-        else:
-            self.list = self.list[1:]
+        count = len(particles) if isinstance(particles, list) else 1
+        for _ in range(min(count, len(self.list))):
+            self.list.popleft()
         return self.list
 
 
 class StackSample(ListSample):
     """
-    A sample which uses a stack for storage of particles.
+    A sample which uses a stack for storage of particles. Stored in a deque so adding and removing take constant time.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of particles held, once full pushing onto the stack drops particles from the bottom. None for
+        no limit.
     """
 
-    def __init__(self, graph):
+    def __init__(self, graph, capacity=None):
         super(StackSample, self).__init__(graph)
+        self.capacity = capacity
+        self.list = deque(maxlen=capacity)
 
     def read(self):
         """
@@ -304,11 +586,22 @@ class StackSample(ListSample):
         List<Particle>
 
         """
-        return super(StackSample, self).read()
+        return list(self.list)
+
+    def view(self):
+        """
+        Returns the deque without copying, must not be modified.
+
+        Returns
+        -------
+        deque<Particle>
+
+        """
+        return self.list
 
     def add(self, particles=None):
         """
-        Pushes list of particles onto the top of the sample stack.
+        Pushes list of particles onto the top of the sample stack, the first of the list ends up on top.
 
         Parameters
         ----------
@@ -320,16 +613,19 @@ class StackSample(ListSample):
         Returns storage to confirm successful change.
 
         """
-        if self.list:
-            # print len(particles.rst)
-            self.list = particles + self.list
-        elif isinstance(particles, list):
-            self.list = particles
+        if isinstance(particles, list):
+            self.list.extendleft(reversed(particles))
         else:
-            self.list = [particles]
-        # print len(self.list)
+            self.list.appendleft(particles)
         return self.list
 
+    def sample_and_remove(self, k, rng=random):
+        """
+        Removes k particles chosen uniformly at random and returns them, the order of the remaining particles is
+        preserved.
+        """
+        return ordered_sample(self.list, k, rng)
+
     def remove(self, particles=None):
         """
         The length n of the particle list is used to pop the top n particles from the stack, removing them from the
@@ -345,22 +641,28 @@ class StackSample(ListSample):
         Returns storage to confirm successful change.
 
         """
-        # print self.list
-        # print particles.rst
-        if isinstance(particles, list):
-            self.list = self.list[len(particles):]
-        else:
-            self.list = self.list[1:]
+        count = len(particles) if isinstance(particles, list) else 1
+        for _ in range(min(count, len(self.list))):
+            self.list.popleft()
         return self.list
 
 
 class StackEnvironment(ListEnvironment):
     """
-    An Environment which uses a stack for storage of variables.
+    An Environment which uses a stack for storage of variables. Stored in a deque so adding and removing take constant
+    time.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of variables held, once full pushing onto the stack drops variables from the bottom. None for
+        no limit.
     """
 
-    def __init__(self, graph):
+    def __init__(self, graph, capacity=None):
         super(StackEnvironment, self).__init__(graph)
+        self.capacity = capacity
+        self.list = deque(maxlen=capacity)
 
     def read(self):
         """
@@ -368,14 +670,25 @@ class StackEnvironment(ListEnvironment):
 
         Returns
         -------
-        List<Particle>
+        List<Variable>
 
         """
-        return super(StackEnvironment, self).read()
+        return list(self.list)
+
+    def view(self):
+        """
+        Returns the deque without copying, must not be modified.
+
+        Returns
+        -------
+        deque<Variable>
+
+        """
+        return self.list
 
     def add(self, variables=None):
         """
-        Pushes list of variables onto the top of the environment stack.
+        Pushes list of variables onto the top of the environment stack, the first of the list ends up on top.
 
         Parameters
         ----------
@@ -387,14 +700,10 @@ class StackEnvironment(ListEnvironment):
         Returns storage to confirm successful change.
 
         """
-        if self.list:
-            # print len(variables)
-            self.list = variables + self.list
-        elif isinstance(variables, list):
-            self.list = variables
+        if isinstance(variables, list):
+            self.list.extendleft(reversed(variables))
         else:
-            self.list = [variables]
-        # print len(self.list)
+            self.list.appendleft(variables)
         return self.list
 
     def remove(self, variables=None):
@@ -405,41 +714,57 @@ class StackEnvironment(ListEnvironment):
         Parameters
         ----------
         variables : List<Variable>
-            variables list length of which is to be used to remove particles from stack.
+            variables list length of which is to be used to remove variables from stack.
 
         Returns
         --------
         Returns storage to confirm successful change.
 
         """
-        # print self.list
-        # print particles.rst
-        if isinstance(variables, list):
-            self.list = self.list[len(variables):]
-        else:
-            self.list = self.list[1:]
+        count = len(variables) if isinstance(variables, list) else 1
+        for _ in range(min(count, len(self.list))):
+            self.list.popleft()
         return self.list
 
 
 class QueueTank(ListTank):
     """
-    Tank using a queue for storage
+    Tank using a queue for storage. Stored in a deque so adding and removing take constant time.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of particles held, once full adding to the queue drops particles from the front. None for no
+        limit.
     """
 
-    def __init__(self, graph):
+    def __init__(self, graph, capacity=None):
         super(QueueTank, self).__init__(graph)
+        self.capacity = capacity
+        self.list = deque(maxlen=capacity)
 
     def read(self):
         """
-        Returns a full copy of the queue.
+        Returns a full copy of the queue, an empty list if the queue is empty, including one never added to.
 
         Returns
         -------
-        List<particles>
+        List<Particle>
             list of the queue contents.
 
         """
-        return super(QueueTank, self).read()
+        return list(self.list)
+
+    def view(self):
+        """
+        Returns the deque without copying, must not be modified.
+
+        Returns
+        -------
+        deque<Particle>
+
+        """
+        return self.list
 
     def add(self, particles=None):
         """
@@ -455,16 +780,19 @@ class QueueTank(ListTank):
         Returns storage to confirm successful change.
 
         """
-        if self.list:
-            # print len(particles.rst)
-            self.list = self.list + particles
-        elif isinstance(particles, list):
-            self.list = particles
+        if isinstance(particles, list):
+            self.list.extend(particles)
         else:
-            self.list = [particles]
-        # print len(self.list)
+            self.list.append(particles)
         return self.list
 
+    def sample_and_remove(self, k, rng=random):
+        """
+        Removes k particles chosen uniformly at random and returns them, the order of the remaining particles is
+        preserved.
+        """
+        return ordered_sample(self.list, k, rng)
+
     def remove(self, particles=None):
         """
         Remove particles from front of queue equal in number to length of particles.
@@ -479,22 +807,27 @@ class QueueTank(ListTank):
         Returns storage to confirm successful change.
 
         """
-        # print self.list
-        # print particles.rst
-        if isinstance(particles, list):
-            self.list = self.list[len(particles):]
-        else:
-            self.list = self.list[1:]
+        count = len(particles) if isinstance(particles, list) else 1
+        for _ in range(min(count, len(self.list))):
+            self.list.popleft()
         return self.list
 
 
 class QueueSample(ListSample):
     """
-    Sample using a queue for storage
+    Sample using a queue for storage. Stored in a deque so adding and removing take constant time.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of particles held, once full adding to the queue drops particles from the front. None for no
+        limit.
     """
 
-    def __init__(self, graph):
+    def __init__(self, graph, capacity=None):
         super(QueueSample, self).__init__(graph)
+        self.capacity = capacity
+        self.list = deque(maxlen=capacity)
 
     def read(self):
         """
@@ -502,11 +835,22 @@ class QueueSample(ListSample):
 
         Returns
         -------
-        List<particles>
+        List<Particle>
             list of the queue contents.
 
         """
-        return super(QueueSample, self).read()
+        return list(self.list)
+
+    def view(self):
+        """
+        Returns the deque without copying, must not be modified.
+
+        Returns
+        -------
+        deque<Particle>
+
+        """
+        return self.list
 
     def add(self, particles=None):
         """
@@ -522,16 +866,19 @@ class QueueSample(ListSample):
         Returns storage to confirm successful change.
 
         """
-        if self.list:
-            # print len(particles.rst)
-            self.list = self.list + particles
-        elif isinstance(particles, list):
-            self.list = particles
+        if isinstance(particles, list):
+            self.list.extend(particles)
         else:
-            self.list = [particles]
-        # print len(self.list)
+            self.list.append(particles)
         return self.list
 
+    def sample_and_remove(self, k, rng=random):
+        """
+        Removes k particles chosen uniformly at random and returns them, the order of the remaining particles is
+        preserved.
+        """
+        return ordered_sample(self.list, k, rng)
+
     def remove(self, particles=None):
         """
         Remove particles from front of queue equal in number to length of particles.
@@ -546,22 +893,27 @@ class QueueSample(ListSample):
         Returns storage to confirm successful change.
 
         """
-        # print self.list
-        # print particles.rst
-        if isinstance(particles, list):
-            self.list = self.list[len(particles):]
-        else:
-            self.list = self.list[1:]
+        count = len(particles) if isinstance(particles, list) else 1
+        for _ in range(min(count, len(self.list))):
+            self.list.popleft()
         return self.list
 
 
 class QueueEnvironment(ListEnvironment):
     """
-    Environment using a queue for storage
+    Environment using a queue for storage. Stored in a deque so adding and removing take constant time.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of variables held, once full adding to the queue drops variables from the front. None for no
+        limit.
     """
 
-    def __init__(self, graph):
+    def __init__(self, graph, capacity=None):
         super(QueueEnvironment, self).__init__(graph)
+        self.capacity = capacity
+        self.list = deque(maxlen=capacity)
 
     def read(self):
         """
@@ -573,7 +925,18 @@ class QueueEnvironment(ListEnvironment):
             list of the queue contents.
 
         """
-        return super(QueueEnvironment, self).read()
+        return list(self.list)
+
+    def view(self):
+        """
+        Returns the deque without copying, must not be modified.
+
+        Returns
+        -------
+        deque<Variable>
+
+        """
+        return self.list
 
     def add(self, variables=None):
         """
@@ -589,14 +952,10 @@ class QueueEnvironment(ListEnvironment):
         Returns storage to confirm successful change.
 
         """
-        if self.list:
-            # print len(variables)
-            self.list = self.list + variables
-        elif isinstance(variables, list):
-            self.list = variables
+        if isinstance(variables, list):
+            self.list.extend(variables)
         else:
-            self.list = [variables]
-        # print len(self.list)
+            self.list.append(variables)
         return self.list
 
     def remove(self, variables=None):
@@ -613,16 +972,65 @@ class QueueEnvironment(ListEnvironment):
         Returns storage to confirm successful change.
 
         """
-        # print self.list
-        # print particles.rst
-        if isinstance(variables, list):
-            self.list = self.list[len(variables):]
-        else:
-            self.list = self.list[1:]
+        count = len(variables) if isinstance(variables, list) else 1
+        for _ in range(min(count, len(self.list))):
+            self.list.popleft()
         return self.list
 
 
-class DictionaryTank(CoreNode.Tank):
+class KeySampling(object):
+    """
+    Mixin for dictionary containers which keeps a list of the keys, with a map from key to position, so entries can
+    be sampled uniformly in time proportional to the sample size rather than the size of the dictionary. The list is
+    built on first use and then kept up to date by add and remove, so the dictionary must only be changed through
+    them.
+    """
+    key_list = None
+    key_positions = None
+
+    def sample_values(self, k, rng=random):
+        """
+        Returns k values from distinct entries chosen uniformly at random, or every value if there are fewer than k.
+
+        Parameters
+        ----------
+        k : int
+            Number of values to sample.
+        rng : random.Random
+            Random number generator used for the choice.
+
+        Returns
+        -------
+        List<>
+            The sampled values.
+        """
+        if self.key_list is None:
+            self.key_list = list(self.dict)
+            self.key_positions = {key: position for position, key in enumerate(self.key_list)}
+        keys = self.key_list
+        return [self.dict[keys[i]] for i in rng.sample(range(len(keys)), min(k, len(keys)))]
+
+    def keys_added(self, keys):
+        if self.key_list is not None:
+            for key in keys:
+                if key not in self.key_positions:
+                    self.key_positions[key] = len(self.key_list)
+                    self.key_list.append(key)
+
+    def key_removed(self, key):
+        if self.key_list is not None and key in self.key_positions:
+            position = self.key_positions.pop(key)
+            last = self.key_list.pop()
+            if position < len(self.key_list):
+                self.key_list[position] = last
+                self.key_positions[last] = position
+
+    def keys_invalidated(self):
+        self.key_list = None
+        self.key_positions = None
+
+
+class DictionaryTank(KeySampling, CoreNode.Tank):
     """
     Environment which stores variables by name value pair in a dictionary.
 
@@ -644,6 +1052,18 @@ class DictionaryTank(CoreNode.Tank):
         """
         return self.dict.copy()
 
+    def view(self):
+        """
+        Returns a read only proxy of the dictionary without copying.
+
+        Returns
+        -------
+        dict: MappingProxyType<>
+            Dictionary of variables.
+
+        """
+        return MappingProxyType(self.dict)
+
     def add(self, particles=None):
         """
         Adds variables to dictionary.
@@ -658,8 +1078,8 @@ class DictionaryTank(CoreNode.Tank):
         Returns storage to confirm successful change.
 
         """
-        self.dict = self.dict | particles
-        # print len(self.list)
+        self.dict.update(particles)
+        self.keys_added(particles)
         return self.dict
 
     def remove(self, particles=None):
@@ -677,12 +1097,13 @@ class DictionaryTank(CoreNode.Tank):
 
         """
         for p in particles:
-            if p in self.dict.keys():
+            if p in self.dict:
                 del self.dict[p]
+                self.key_removed(p)
         return self.dict
 
 
-class DictionaryEnvironment(CoreNode.Environment):
+class DictionaryEnvironment(KeySampling, CoreNode.Environment):
     """
     Environment which stores variables by name value pair in a dictionary.
 
@@ -705,6 +1126,18 @@ class DictionaryEnvironment(CoreNode.Environment):
         """
         return self.dict.copy()
 
+    def view(self):
+        """
+        Returns a read only proxy of the dictionary without copying.
+
+        Returns
+        -------
+        dict: MappingProxyType<>
+            Dictionary of variables.
+
+        """
+        return MappingProxyType(self.dict)
+
     def add(self, variables=None):
         """
         Adds variables to dictionary.
@@ -720,7 +1153,7 @@ class DictionaryEnvironment(CoreNode.Environment):
 
         """
         self.dict.update(variables)
-        # print len(self.list)
+        self.keys_added(variables)
         return self.dict
 
     def remove(self, variables=None):
@@ -738,30 +1171,185 @@ class DictionaryEnvironment(CoreNode.Environment):
 
         """
         for var in variables:
-            if var in self.dict.keys():
+            if var in self.dict:
                 del self.dict[var]
+                self.key_removed(var)
         return self.dict
 
 
+class CounterEnvironment(CoreNode.Environment):
+    """
+    Environment holding a single value, used for clocks and counters. Nodes which know they are connected to a
+    counter use get, set and incr directly, other nodes see it as a list environment of at most one variable where
+    add replaces the value and remove clears it.
+
+    Parameters
+    ----------
+    value : int
+        Initial value, None for an empty counter.
+    """
+
+    def __init__(self, graph, value=None):
+        super(CounterEnvironment, self).__init__(graph)
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+    def incr(self, amount=1):
+        """
+        Adds amount to the value and returns the new value.
+        """
+        self.value = self.value + amount
+        return self.value
+
+    def read(self):
+        """
+        Returns the value in a list, empty if there is no value.
+
+        Returns
+        -------
+        list: List<Variable>
+        """
+        return [self.value] if self.value is not None else []
+
+    def peek(self, index=0):
+        if self.value is None or index not in (0, -1):
+            raise IndexError("Counter index out of range")
+        return self.value
+
+    def __len__(self):
+        return 0 if self.value is None else 1
+
+    def add(self, variables=None):
+        """
+        Replaces the value, the first of a list of variables is used.
+        """
+        self.value = variables[0] if isinstance(variables, list) else variables
+        return self.value
+
+    def remove(self, variables=None):
+        """
+        Clears the value.
+        """
+        self.value = None
+        return self.value
+
+
 class DataFrameEnvironment(CoreNode.Environment):
+    """
+    Environment which stores rows of variables in a pandas DataFrame.
+
+    Parameters
+    ----------
+    columns : List<String>
+        Names of the columns, rows added must have exactly these keys in this order.
+    buffer_size : int
+        If set, added rows are collected in plain lists, one per column, and only written to the DataFrame when it is
+        read or once buffer_size rows are waiting. Avoids enlarging the DataFrame one row at a time.
+    key_columns : List<String>
+        If set, rows are indexed by the values in these columns and remove matches rows on the key columns only. A
+        removed row is marked dead rather than dropped, dead rows are dropped together when the frame is read or once
+        compact_every rows are dead.
+    compact_every : int
+        Number of dead rows which triggers compaction in key indexed mode.
+    """
 
-    def __init__(self, graph, columns):
+    def __init__(self, graph, columns, buffer_size=None, key_columns=None, compact_every=1024):
         super(DataFrameEnvironment, self).__init__(graph)
         self.DataFrame = pd.DataFrame(columns=columns)
+        self.columns = list(columns)
+        self.buffer_size = buffer_size
+        self.buffer = {column: [] for column in self.columns}
+        self.buffered = 0
+        if key_columns and not set(key_columns) <= set(self.columns):
+            raise ValueError("Key columns must be columns of the DataFrame")
+        self.key_columns = list(key_columns) if key_columns else None
+        self.compact_every = compact_every
+        self.key_index = {}
+        self.dead = set()
 
     def read(self):
+        self.flush()
+        if self.dead:
+            self.compact()
         return self.DataFrame
 
+    def peek(self, index=0):
+        return self.read().iloc[index]
+
+    def __iter__(self):
+        return (row for _, row in self.read().iterrows())
+
     def add(self, variables=None):
-        if isinstance(variables, list):
+        if self.key_columns:
+            rows = variables if isinstance(variables, list) else [variables]
+            if list(rows[0].keys()) == self.columns:
+                self.index_rows(rows, len(self.DataFrame) + self.buffered)
+        if self.buffer_size:
+            rows = variables if isinstance(variables, list) else [variables]
+            if list(rows[0].keys()) == self.columns:
+                for row in rows:
+                    for column in self.columns:
+                        self.buffer[column].append(row[column])
+                self.buffered = self.buffered + len(rows)
+                if self.buffered >= self.buffer_size:
+                    self.flush()
+        elif isinstance(variables, list):
             if list(variables[0].keys()) == list(self.DataFrame.columns):
                 temp_df = pd.DataFrame(variables)
                 self.DataFrame = pd.concat([self.DataFrame, temp_df], ignore_index=True)
         elif list(variables.keys()) == list(self.DataFrame.columns):
             self.DataFrame.loc[len(self.DataFrame)] = variables
 
+    def flush(self):
+        """
+        Writes any buffered rows to the DataFrame in a single concatenation.
+        """
+        if not self.buffered:
+            return
+        temp_df = pd.DataFrame(self.buffer, columns=self.columns)
+        if self.DataFrame.empty:
+            self.DataFrame = temp_df
+        else:
+            self.DataFrame = pd.concat([self.DataFrame, temp_df], ignore_index=True)
+        self.buffer = {column: [] for column in self.columns}
+        self.buffered = 0
+
+    def index_rows(self, rows, position):
+        """
+        Adds rows to the key index, numbering them from the given position.
+        """
+        for offset, row in enumerate(rows):
+            key = tuple(row[column] for column in self.key_columns)
+            self.key_index.setdefault(key, []).append(position + offset)
+
+    def compact(self):
+        """
+        Drops dead rows from the DataFrame and rebuilds the key index over the remaining rows.
+        """
+        self.flush()
+        keep = np.ones(len(self.DataFrame), dtype=bool)
+        keep[list(self.dead)] = False
+        self.DataFrame = self.DataFrame[keep].reset_index(drop=True)
+        self.dead = set()
+        self.key_index = {}
+        keys = zip(*(self.DataFrame[column] for column in self.key_columns))
+        for position, key in enumerate(keys):
+            self.key_index.setdefault(key, []).append(position)
+
     def remove(self, variables=None):
-        df = self.DataFrame
+        if self.key_columns:
+            rows = variables if isinstance(variables, list) else [variables]
+            for row in rows:
+                self.dead.update(self.key_index.pop(tuple(row[column] for column in self.key_columns), []))
+            if len(self.dead) >= self.compact_every:
+                self.compact()
+            return
+        df = self.read()
         if isinstance(variables, list):
             for row in variables:
                 check = df[(df == pd.Series(row)).all(1)]
@@ -771,6 +1359,228 @@ class DataFrameEnvironment(CoreNode.Environment):
             self.DataFrame.drop(check.index, inplace=True)
 
 
+class DiskLogEnvironment(CoreNode.Environment):
+    """
+    Append only log environment which streams rows to disk instead of keeping them in memory. Rows are buffered and
+    written every chunk_size rows as a numpy .npz file per chunk in the log directory, one array per column, named by
+    the range of rows it holds. Values should be ids, numbers or strings, other objects are stored as their string.
+    Columns holding tuples are stored flat with an offsets array, columns mixing numbers with other values, such as
+    'n/a' ids, are stored as object arrays so the numbers keep their type. Reading returns a DiskLogReader which
+    loads chunks on demand.
+
+    Rows still buffered are written by flush, read or close. The environment can be used as a context manager which
+    closes it on exit.
+
+    The instance records how many rows it has written, so the log holds chunks covering rows 0 to written. Reading
+    raises a ValueError if the directory holds chunks beyond that range, as left behind when the instance is rolled
+    back, and restore, called by Simulate.resume, deletes them. A log resumed from a checkpoint must be built with
+    mode "append" so the chunks written before the checkpoint are kept.
+
+    Parameters
+    ----------
+    path : String
+        Directory the chunks are written to, created if missing.
+    columns : List<String>
+        Names of the columns, rows added must have exactly these keys in this order.
+    chunk_size : int
+        Number of rows written per chunk.
+    mode : String
+        What to do with chunks already in the directory, "new" raises a ValueError if there are any, "append" adds
+        the new rows after them and "overwrite" deletes them.
+    """
+
+    def __init__(self, graph, path, columns, chunk_size=10000, mode="new"):
+        super(DiskLogEnvironment, self).__init__(graph)
+        if mode not in ("new", "append", "overwrite"):
+            raise ValueError("Unknown log mode: " + str(mode))
+        os.makedirs(path, exist_ok=True)
+        existing = [name for name in os.listdir(path) if name.endswith(".npz") or name.endswith(".npz.tmp")]
+        if existing and mode == "new":
+            raise ValueError("Log directory already holds chunks, use mode append or overwrite: " + path)
+        if mode == "overwrite":
+            for name in existing:
+                os.remove(os.path.join(path, name))
+        self.path = path
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+        self.buffer = {column: [] for column in self.columns}
+        self.buffered = 0
+        self.written = len(DiskLogReader(path))
+
+    def read(self):
+        """
+        Writes any buffered rows and returns a lazy reader over the whole log.
+
+        Returns
+        -------
+        DiskLogReader
+        """
+        self.flush()
+        reader = DiskLogReader(self.path)
+        if len(reader) != self.written:
+            raise ValueError("Log directory holds %d rows but %d were written, stale chunks left in: %s"
+                             % (len(reader), self.written, self.path))
+        return reader
+
+    def peek(self, index=0):
+        return self.read()[index]
+
+    def __len__(self):
+        return self.written + self.buffered
+
+    def add(self, variables=None):
+        rows = variables if isinstance(variables, list) else [variables]
+        if list(rows[0].keys()) == self.columns:
+            for row in rows:
+                for column in self.columns:
+                    self.buffer[column].append(row[column])
+                self.buffered = self.buffered + 1
+                if self.buffered >= self.chunk_size:
+                    self.flush()
+
+    def remove(self, variables=None):
+        raise ValueError("DiskLogEnvironment is append only")
+
+    def close(self):
+        """
+        Writes any buffered rows, call once logging has finished.
+        """
+        self.flush()
+
+    def restore(self):
+        """
+        Deletes the chunks holding rows past written, which were written after the state being restored.
+        """
+        for name in os.listdir(self.path):
+            if name.endswith(".npz.tmp") or (name.endswith(".npz") and int(name[:-4].split("-")[1]) > self.written):
+                os.remove(os.path.join(self.path, name))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def flush(self):
+        """
+        Writes the buffered rows as a single chunk. The chunk is written under a temporary name and moved into place
+        once complete.
+        """
+        if not self.buffered:
+            return
+        arrays = {CHUNK_COLUMNS: np.array(self.columns)}
+        for column in self.columns:
+            values = self.buffer[column]
+            if any(isinstance(value, (tuple, list)) for value in values):
+                sequences = [value if isinstance(value, (tuple, list)) else (value,) for value in values]
+                arrays[column] = column_array([item for sequence in sequences for item in sequence])
+                arrays[column + CHUNK_OFFSETS] = np.cumsum([0] + [len(sequence) for sequence in sequences])
+            else:
+                arrays[column] = column_array(values)
+        start = self.written
+        stop = start + self.buffered
+        name = os.path.join(self.path, "%012d-%012d.npz" % (start, stop))
+        with open(name + ".tmp", "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(name + ".tmp", name)
+        self.written = stop
+        self.buffer = {column: [] for column in self.columns}
+        self.buffered = 0
+
+
+def column_array(values):
+    """
+    Converts a column of values to a numpy array. Columns mixing numbers with other values are kept as object arrays,
+    other columns of objects are stored as strings.
+    """
+    numeric = set(isinstance(value, numbers.Number) for value in values)
+    if len(numeric) > 1:
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    array = np.asarray(values)
+    if array.dtype == object:
+        array = array.astype(str)
+    return array
+
+
+class DiskLogReader(object):
+    """
+    Lazy reader over a log written by DiskLogEnvironment. Indexing with a slice loads only the chunks covering the
+    slice and returns the rows as a DataFrame, indexing with an int returns a single row. Iterating yields rows one
+    chunk at a time. The chunks must run on from each other from row 0, a ValueError is raised if they overlap or
+    leave a gap.
+
+    Parameters
+    ----------
+    path : String
+        Directory holding the log chunks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.chunks = []
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".npz"):
+                    start, stop = name[:-4].split("-")
+                    self.chunks.append((int(start), int(stop), os.path.join(path, name)))
+        stop = 0
+        for chunk_start, chunk_stop, name in self.chunks:
+            if chunk_start != stop:
+                raise ValueError("Log chunks overlap or leave a gap at row %d: %s" % (stop, path))
+            stop = chunk_stop
+
+    def __len__(self):
+        return self.chunks[-1][1] if self.chunks else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            frame = self.frame(start, stop) if step > 0 else self.frame(stop + 1, start + 1)
+            return frame.iloc[::step].reset_index(drop=True)
+        if index < 0:
+            index = index + len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Log row out of range")
+        return self.frame(index, index + 1).iloc[0]
+
+    def __iter__(self):
+        for start, stop, name in self.chunks:
+            for _, row in self.load(name, 0, stop - start).iterrows():
+                yield row
+
+    def frame(self, start, stop):
+        """
+        Loads rows start to stop, not including stop, as a DataFrame.
+        """
+        frames = []
+        for chunk_start, chunk_stop, name in self.chunks:
+            if chunk_stop > start and chunk_start < stop:
+                frames.append(self.load(name, max(start, chunk_start) - chunk_start,
+                                        min(stop, chunk_stop) - chunk_start))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def load(name, start, stop):
+        """
+        Loads the given rows of a single chunk.
+        """
+        with np.load(name, allow_pickle=True) as data:
+            columns = list(data[CHUNK_COLUMNS])
+            table = {}
+            for column in columns:
+                if column + CHUNK_OFFSETS in data:
+                    flat = data[column].tolist()
+                    offsets = data[column + CHUNK_OFFSETS][start:stop + 1]
+                    table[column] = [tuple(flat[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+                else:
+                    table[column] = data[column][start:stop]
+        return pd.DataFrame(table, columns=columns)
+
+
 class LinkTank(CoreNode.Tank):
     """
     Link tanks are used to declare subgraphs which can be linked into templates. They act as a forwarding system.
@@ -788,12 +1598,27 @@ class LinkTank(CoreNode.Tank):
     def read(self):
         return self.linknode.read()
 
+    def view(self):
+        return self.linknode.view()
+
+    def peek(self, index=0):
+        return self.linknode.peek(index)
+
+    def __len__(self):
+        return len(self.linknode)
+
+    def __iter__(self):
+        return iter(self.linknode)
+
     def add(self, particles=None):
         return self.linknode.add(particles)
 
     def remove(self, particles=None):
         return self.linknode.remove(particles)
 
+    def move_all_to(self, other):
+        return self.linknode.move_all_to(other)
+
     def set_linknode(self, link):
         self.linknode = link
 
@@ -818,12 +1643,27 @@ class LinkSample(CoreNode.Sample):
     def read(self):
         return self.linknode.read()
 
+    def view(self):
+        return self.linknode.view()
+
+    def peek(self, index=0):
+        return self.linknode.peek(index)
+
+    def __len__(self):
+        return len(self.linknode)
+
+    def __iter__(self):
+        return iter(self.linknode)
+
     def add(self, particles=None):
         return self.linknode.add(particles)
 
     def remove(self, particles=None):
         return self.linknode.remove(particles)
 
+    def move_all_to(self, other):
+        return self.linknode.move_all_to(other)
+
     def set_linknode(self, link):
         self.linknode = link
 
@@ -848,12 +1688,27 @@ class LinkEnvironment(CoreNode.Environment):
     def read(self):
         return self.linknode.read()
 
+    def view(self):
+        return self.linknode.view()
+
+    def peek(self, index=0):
+        return self.linknode.peek(index)
+
+    def __len__(self):
+        return len(self.linknode)
+
+    def __iter__(self):
+        return iter(self.linknode)
+
     def add(self, variables=None):
         return self.linknode.add(variables)
 
     def remove(self, variables=None):
         return self.linknode.remove(variables)
 
+    def move_all_to(self, other):
+        return self.linknode.move_all_to(other)
+
     def set_linknode(self, link):
         self.linknode = link
 
@@ -871,6 +1726,7 @@ class NestedGridTank(DictionaryTank):
         self.gridcols = gridcols
 
     def add(self, particles=None, full=False, tank=None, append=False):
+        self.keys_invalidated()
         if full:
             for i in range(0, len(particles)):
                 self.dict[i] = particles[i]
@@ -892,6 +1748,7 @@ class NestedGridTank(DictionaryTank):
             self.dict[len(self.dict.keys())] = particles
 
     def remove(self, particles=None, full=False, tank=None, append=False):
+        self.keys_invalidated()
         if full:
             self.dict = {}
         elif tank is not None:
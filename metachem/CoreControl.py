@@ -1,44 +1,56 @@
+from itertools import islice
+
 import metachem.CoreNode as CoreNode
 from metachem import CoreContainer
-import random
 
 
 class BruteSampler(CoreNode.Sampler):
     """
-    Sampler that moves full content from one particle container to another.
+    Sampler that moves full content from one particle container to another. Unless a subclass changes how particles
+    are read, pulled or pushed, the contents are moved in a single move_all_to call during pull, which lets list
+    containers hand over their storage without copying.
 
     """
 
     def __init__(self, graph, containersin, containersout, readcontainers=None):
         super(BruteSampler, self).__init__(graph, containersin, containersout, readcontainers)
         self.sample = []
+        cls = type(self)
+        self.splice = cls.read is BruteSampler.read and cls.pull is BruteSampler.pull and \
+            cls.push is BruteSampler.push
         pass
 
     def read(self):
         """
-        Reads in a copy of all particles from the input container to sample list.
+        Reads in a copy of all particles from the input container to sample list. Skipped when splicing.
         """
-        self.sample = self.containersin.read()
+        if not self.splice:
+            self.sample = self.containersin.read()
 
     def pull(self):
         """
-        Removes all particles from the input container.
+        Removes all particles from the input container, when splicing moves them straight to the output container.
         """
+        if self.splice:
+            self.containersin.move_all_to(self.containersout)
+            return
         self.containersin.remove(self.sample)
         pass
 
     def push(self):
         """
-        Adds all particles in sample to the output container.
+        Adds all particles in sample to the output container. Skipped when splicing.
         """
-        self.containersout.add(self.sample)
+        if not self.splice:
+            self.containersout.add(self.sample)
         pass
 
 
 class SimpleSampler(CoreNode.Sampler):
     """
     Takes a random uniformly distributed sample of a fixed size from the input container and moves it to an output
-    container.
+    container. If the input container has sample_and_remove, and neither the sampler's read and pull nor the
+    container's remove are overridden, the sample is chosen and removed in a single call during pull.
 
     Parameters
     ------------
@@ -50,6 +62,9 @@ class SimpleSampler(CoreNode.Sampler):
         super(SimpleSampler, self).__init__(graph, containersin, containersout, readcontainers)
         self.size = size
         self.sample = []
+        cls = type(self)
+        self.single_step = cls.read is SimpleSampler.read and cls.pull is SimpleSampler.pull and \
+            samples_with_remove(containersin)
         pass
 
     def read(self):
@@ -59,16 +74,22 @@ class SimpleSampler(CoreNode.Sampler):
         """
         if isinstance(self.containersin, CoreContainer.DictionaryTank) or \
                 isinstance(self.containersin, CoreContainer.DictionaryEnvironment):
-            self.sample = random.sample(list(self.containersin.read().values()),
-                                        min(self.size, len(list(self.containersin.read().values()))))
+            self.sample = self.containersin.sample_values(self.size, self.rng)
+        elif self.single_step:
+            # sampled and removed together in pull
+            self.sample = []
         else:
-            self.sample = random.sample(self.containersin.read(), min(self.size, len(self.containersin.read())))
+            self.sample = self.rng.sample(self.containersin.view(), min(self.size, len(self.containersin)))
 
     def pull(self):
         """
-        Removes each of the particles in the sample from the input container.
+        Removes each of the particles in the sample from the input container. Containers with sample_and_remove
+        choose and remove the sample in a single step here instead.
 
         """
+        if self.single_step:
+            self.sample = self.containersin.sample_and_remove(self.size, self.rng)
+            return
         [self.containersin.remove(elem) for elem in self.sample]
         pass
 
@@ -81,6 +102,16 @@ class SimpleSampler(CoreNode.Sampler):
         pass
 
 
+def samples_with_remove(container):
+    """
+    Whether a container's sample_and_remove can stand in for its remove, which is the case only if remove is not
+    overridden below the class defining sample_and_remove.
+    """
+    cls = type(container)
+    owner = next((base for base in cls.__mro__ if "sample_and_remove" in vars(base)), None)
+    return owner is not None and cls.remove is owner.remove
+
+
 class OrderedSampler(CoreNode.Sampler):
     """
     Takes the first n elements from the input container and moves them to the output container.
@@ -102,7 +133,7 @@ class OrderedSampler(CoreNode.Sampler):
         Copies the first n particles from the input container to the internal sample.
 
         """
-        self.sample = self.containersin.read()[0:self.size]
+        self.sample = list(islice(self.containersin.view(), self.size))
 
     def pull(self):
         """
@@ -125,6 +156,8 @@ class ClockObserver(CoreNode.Observer):
     """
     Is connected to a clock container and increments a single variable by a fixed value.
 
+    If the clock container is a CounterEnvironment the value is read and written directly.
+
     Parameters
     -----------
     increment : int
@@ -139,6 +172,7 @@ class ClockObserver(CoreNode.Observer):
             self.increment = increment
             self.clock = 0
             self.variable = self.containersin
+            self.counter = isinstance(self.variable, CoreContainer.CounterEnvironment)
             pass
 
     def read(self):
@@ -146,15 +180,16 @@ class ClockObserver(CoreNode.Observer):
         Reads in value of variable to clock.
 
         """
-        self.clock = self.variable.read()[0]
+        self.clock = self.variable.get() if self.counter else self.variable.peek(0)
         pass
 
     def pull(self):
         """
-        Removes clock value from environment.
+        Removes clock value from environment, counters are left to be overwritten in push.
 
         """
-        self.variable.remove(self.clock)
+        if not self.counter:
+            self.variable.remove(self.clock)
 
     def process(self):
         """
@@ -168,7 +203,10 @@ class ClockObserver(CoreNode.Observer):
         Adds clock value to variable Environment.
 
         """
-        self.variable.add(self.clock)
+        if self.counter:
+            self.variable.set(self.clock)
+        else:
+            self.variable.add(self.clock)
         pass
 
 
@@ -176,6 +214,8 @@ class ClockResetObserver(CoreNode.Observer):
     """
     Is connected to a clock container and resets value to reset value.
 
+    If the clock container is a CounterEnvironment the value is read and written directly.
+
     Parameters
     -----------
     reset_value : int
@@ -190,6 +230,7 @@ class ClockResetObserver(CoreNode.Observer):
             self.reset_value = reset_value
             self.clock = 0
             self.variable = self.containersin
+            self.counter = isinstance(self.variable, CoreContainer.CounterEnvironment)
             pass
 
     def read(self):
@@ -197,15 +238,16 @@ class ClockResetObserver(CoreNode.Observer):
         Reads in value of variable to clock.
 
         """
-        self.clock = self.variable.read()[0]
+        self.clock = self.variable.get() if self.counter else self.variable.peek(0)
         pass
 
     def pull(self):
         """
-        Removes clock value from environment.
+        Removes clock value from environment, counters are left to be overwritten in push.
 
         """
-        self.variable.remove(self.clock)
+        if not self.counter:
+            self.variable.remove(self.clock)
 
     def process(self):
         """
@@ -219,7 +261,10 @@ class ClockResetObserver(CoreNode.Observer):
         Adds clock value to variable Environment.
 
         """
-        self.variable.add(self.clock)
+        if self.counter:
+            self.variable.set(self.clock)
+        else:
+            self.variable.add(self.clock)
         pass
 
 
@@ -245,6 +290,7 @@ class CounterDecision(CoreNode.Decision):
             super(CounterDecision, self).__init__(graph, options, readcontainers)
             self.threshold = threshold
             self.check = 0
+            self.counter = isinstance(readcontainers, CoreContainer.CounterEnvironment)
         else:
             raise ValueError("CounterDecision takes exactly two control options")
         pass
@@ -254,7 +300,7 @@ class CounterDecision(CoreNode.Decision):
         Reads in value of Environment container to check.
 
         """
-        self.check = self.readcontainers.read()[0]
+        self.check = self.readcontainers.get() if self.counter else self.readcontainers.peek(0)
 
     def process(self):
         """
@@ -295,7 +341,7 @@ class EmptyDecision(CoreNode.Decision):
         Read in the contents of the read container (if any).
 
         """
-        self.check = self.readcontainers.read()
+        self.check = len(self.readcontainers)
 
     def process(self):
         """
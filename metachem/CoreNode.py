@@ -15,11 +15,15 @@ control as well as the specific classes of nodes used in implementing MetaChem g
 import abc
 import random
 
+import numpy as np
+
 
 class ContainerNode(object):
     """
     A super class for the basic description of a container node. Should instantiate a container suitable for the
-    chemistries particles.
+    chemistries particles. Besides the copying read, containers offer a read only view API, view, len, peek and
+    iteration, for nodes which only inspect the contents. The defaults here fall back on read so every container
+    supports it, subclasses override view to avoid the copy.
 
     Parameters
     ----------
@@ -48,6 +52,65 @@ class ContainerNode(object):
         """
         pass
 
+    def view(self):
+        """
+        Returns the contents of the container without copying where possible. The result must not be modified and
+        may change as the container is changed, use read to keep a copy.
+
+        Returns
+        -------
+        list of objects
+            The particles or variables in the container.
+        """
+        return self.read()
+
+    def peek(self, index=0):
+        """
+        Returns a single item of the container without copying the rest.
+
+        Parameters
+        ----------
+        index : int
+            Position of the item in the container.
+        """
+        return self.view()[index]
+
+    def __len__(self):
+        contents = self.view()
+        return len(contents) if contents is not None else 0
+
+    def __iter__(self):
+        contents = self.view()
+        return iter(contents if contents is not None else [])
+
+    def move_all_to(self, other):
+        """
+        Moves the full contents of the container to another container. The default removes a copy of the contents
+        and adds it to the other container, subclasses override it to hand over their storage without copying where
+        the two containers are compatible.
+
+        Parameters
+        ----------
+        other : ContainerNode
+            Container the contents are added to.
+        """
+        contents = self.read()
+        if contents:
+            self.remove(contents)
+            other.add(contents)
+
+    def restore(self):
+        """
+        Called by Simulate.resume once the container's attributes have been restored from a checkpoint. Containers
+        keeping part of their state outside the instance, such as files on disk, override it to bring that state back
+        in step. The default does nothing.
+        """
+        pass
+
+    def __bool__(self):
+        # containers are always truthy, len must not make an empty container look like a missing one
+        return True
+
     @abc.abstractmethod
     def add(self, particles=None):
         """
@@ -75,6 +138,109 @@ class ContainerNode(object):
         pass
 
 
+def in_graph(graph, node):
+    """
+    Membership test used by control nodes when checking the containers they are wired to. Inside a GraphBuilder the
+    test is recorded and made once when the builder exits instead.
+
+    Parameters
+    ----------
+    graph   :   nx.DiGraph
+        graph the node should be in.
+    node    :   ContainerNode
+        node to look for.
+
+    Returns
+    -------
+    bool
+        True if the node is in the graph or the test has been deferred.
+    """
+    builder = graph.graph.get(GraphBuilder.KEY)
+    if builder is not None:
+        builder.required.append(node)
+        return True
+    return graph.has_node(node)
+
+
+def connect(graph, source, target):
+    """
+    Adds an information edge for a control node, deferred to the end of a GraphBuilder if one is active so that
+    adding the edge does not add a missing container to the graph before it has been checked.
+    """
+    builder = graph.graph.get(GraphBuilder.KEY)
+    if builder is not None:
+        builder.edges.append((source, target))
+    else:
+        graph.add_edge(source, target)
+
+
+class GraphBuilder(object):
+    """
+    Context manager for building large graphs. While active, control nodes created over the graph do not check that
+    the containers they are wired to are in the graph and their information edges are held back. On exit all the
+    checks are made in one pass, every missing container is reported together, and the edges are added in bulk along
+    with any control edges given to add_edges.
+
+    Parameters
+    ----------
+    graph   :   nx.DiGraph
+        graph being built.
+
+    Raises
+    ------
+    ValueError: "Cannot connect to containers not in graph"
+        Raised on exit if any wired container was never added to the graph, no edges are added in that case.
+    """
+    KEY = "metachem_builder"
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.required = []
+        self.edges = []
+
+    def __enter__(self):
+        if self.KEY in self.graph.graph:
+            raise ValueError("Graph is already being built")
+        self.graph.graph[self.KEY] = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        del self.graph.graph[self.KEY]
+        if exc_type is None:
+            self.finish()
+        return False
+
+    def add_edges(self, edges):
+        """
+        Queues control edges to be added when the builder exits.
+
+        Parameters
+        ----------
+        edges   :   iterable of (ControlNode, ControlNode)
+            Control edges in the order they should be added, which sets the order of Decision options.
+        """
+        self.edges.extend(edges)
+
+    def finish(self):
+        """
+        Checks every deferred container and adds the queued edges.
+        """
+        missing = []
+        seen = set()
+        for node in self.required:
+            key = id(node)
+            if key not in seen:
+                seen.add(key)
+                if not self.graph.has_node(node):
+                    missing.append(node)
+        if missing:
+            raise ValueError("Cannot connect to containers not in graph: " +
+                             ", ".join(type(node).__name__ for node in missing))
+        self.graph.add_edges_from(self.edges)
+        self.required = []
+        self.edges = []
+
+
 class ControlNode(object):
     """
     A super class for the basic description of a control node.
@@ -83,14 +249,36 @@ class ControlNode(object):
     ----------
     graph   :   nx.DiGraph
         graph the node is inserted in.
+
+    Attributes
+    ----------
+    rng :   random.Random
+        Random number generator used by the node for all its random draws. Defaults to the global random module,
+        Simulate replaces it with an independent seeded stream per node when given a seed.
+    firing_probability  :   float
+        Class attribute declaring a constant probability of the node firing, equivalent to check always returning
+        1 - firing_probability. Nodes with 1.0 fire without calling check or drawing a random number, other constant
+        probabilities are tested against pregenerated uniforms, see fires. None means check must be called on every
+        transition, it is reset to None for any subclass overriding check without declaring its own value.
+    uniforms    :   list<float>
+        Buffer of pregenerated uniform numbers used by fires.
     """
     __metaclass__ = abc.ABCMeta
+    firing_probability = 1.0
+    uniform_batch = 1024
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "check" in vars(cls) and "firing_probability" not in vars(cls):
+            cls.firing_probability = None
 
     @abc.abstractmethod
     def __init__(self, graph):
         self.id = id(self)
         self.graph = graph
         self.graph.add_node(self)
+        self.rng = random
+        self.uniforms = []
         pass
 
     def transition(self):
@@ -100,12 +288,34 @@ class ControlNode(object):
 
         """
         self.read()
-        if self.check() < random.random():
+        if self.firing_probability == 1.0 or self.fires():
             self.pull()
             self.process()
             self.push()
         pass
 
+    def fires(self):
+        """
+        Decides whether the node processes on this transition. Nodes without a firing_probability compare check against
+        a fresh draw from rng. Nodes with a constant firing_probability take the next number from the uniforms buffer,
+        which is refilled uniform_batch numbers at a time from a generator seeded by rng.
+
+        Returns
+        -------
+        bool
+            True if the node should pull, process and push.
+        """
+        probability = self.firing_probability
+        if probability is None:
+            return self.check() < self.rng.random()
+        if probability >= 1.0:
+            return True
+        if probability <= 0.0:
+            return False
+        if not self.uniforms:
+            self.uniforms = np.random.default_rng(self.rng.getrandbits(64)).random(self.uniform_batch).tolist()
+        return 1.0 - probability < self.uniforms.pop()
+
     @abc.abstractmethod
     def read(self):
         """
@@ -211,6 +421,7 @@ class Action(ControlNode):
 
     """
     __metaclass__ = abc.ABCMeta
+    firing_probability = 1.0
 
     @abc.abstractmethod
     def __init__(self, graph, writesample, readsample, readcontainers=None):
@@ -220,21 +431,21 @@ class Action(ControlNode):
             for rs in readsample:
                 if not isinstance(rs, ContainerNode) or isinstance(rs, Tank):
                     raise ValueError("Action can only read from Samples and Environments")
-                if rs not in list(self.graph.nodes):
+                if not in_graph(self.graph, rs):
                     raise ValueError("Cannot connect to container not in graph")
         elif isinstance(readsample, Tank) or not isinstance(readsample, ContainerNode):
             raise ValueError("Action can only read and write to Samples and Environments")
-        elif readsample not in list(self.graph.nodes):
+        elif not in_graph(self.graph, readsample):
             raise ValueError("Cannot connect to container not in graph")
         if isinstance(writesample, list):
             for ws in writesample:
                 if not isinstance(ws, ContainerNode) or isinstance(ws, Tank):
                     raise ValueError("Action can only write to Samples and Environments")
-                if ws not in list(self.graph.nodes):
+                if not in_graph(self.graph, ws):
                     raise ValueError("Cannot connect to conatiner not in graph")
         elif isinstance(writesample, Tank) or not isinstance(writesample, ContainerNode):
             raise ValueError("Action can only read and write to Samples and Environments")
-        elif writesample not in list(self.graph.nodes):
+        elif not in_graph(self.graph, writesample):
             raise ValueError("Cannot connect to container not in graph")
         if not isinstance(readsample, Sample) or not isinstance(readcontainers, ContainerNode) and readcontainers:
             raise ValueError("Action can only read from containers")
@@ -242,31 +453,31 @@ class Action(ControlNode):
             for rc in readcontainers:
                 if not isinstance(rc, ContainerNode):
                     raise ValueError("Action can only read from containers")
-                elif rc not in list(self.graph.nodes):
+                elif not in_graph(self.graph, rc):
                     raise ValueError("Cannot connect to container not in graph")
-        elif readcontainers and readcontainers not in list(self.graph.nodes):
+        elif readcontainers and not in_graph(self.graph, readcontainers):
             raise ValueError("Cannot connect to container not in graph")
         # add edges from node to write samples
         self.writesample = writesample
         if isinstance(writesample, list):
             for ws in writesample:
-                self.graph.add_edge(self, ws)
+                connect(self.graph, self, ws)
         else:
-            self.graph.add_edge(self, writesample)
+            connect(self.graph, self, writesample)
         # add edges from read samples to node
         self.readsample = readsample
         if isinstance(readsample, list):
             for rs in readsample:
-                self.graph.add_edge(rs, self)
+                connect(self.graph, rs, self)
         else:
-            self.graph.add_edge(readsample, self)
+            connect(self.graph, readsample, self)
         # add edges from read containers to node
         self.readcontainers = readcontainers
         if isinstance(readcontainers, list):
             for rc in readcontainers:
-                self.graph.add_edge(rc, self)
+                connect(self.graph, rc, self)
         elif readcontainers:
-            self.graph.add_edge(readcontainers, self)
+            connect(self.graph, readcontainers, self)
 
     @abc.abstractmethod
     def check(self):
@@ -338,20 +549,20 @@ class Decision(ControlNode):
                 for rc in readcontainers:
                     if not isinstance(rc, ContainerNode):
                         raise ValueError("Decision can only read from containers")
-                    elif rc not in list(self.graph.nodes):
+                    elif not in_graph(self.graph, rc):
                         raise ValueError("Cannot connect to container not in graph")
             elif not isinstance(readcontainers, ContainerNode):
                 raise ValueError("Decision can only read from containers")
-            elif readcontainers not in list(self.graph.nodes):
+            elif not in_graph(self.graph, readcontainers):
                 raise ValueError("Cannot connect to container not in graph")
             self.options = range(0, options)
             # add edges from read containers to node
             self.readcontainers = readcontainers
             if isinstance(readcontainers, list):
                 for rc in readcontainers:
-                    self.graph.add_edge(self, rc)
+                    connect(self.graph, self, rc)
             else:
-                self.graph.add_edge(self, readcontainers)
+                connect(self.graph, self, readcontainers)
         pass
 
     @abc.abstractmethod
@@ -425,6 +636,7 @@ class Sampler(ControlNode):
 
     """
     __metaclass__ = abc.ABCMeta
+    firing_probability = 1.0
 
     @abc.abstractmethod
     def __init__(self, graph, containersin, containersout, readcontainers=None):
@@ -433,41 +645,41 @@ class Sampler(ControlNode):
             for co in containersout:
                 if not isinstance(co, Tank) and not isinstance(co, Sample):
                     raise ValueError("Sampler can only push to particle containers")
-                if co not in list(self.graph.nodes):
+                if not in_graph(self.graph, co):
                     raise ValueError("Cannot connect to container not in graph")
         elif isinstance(containersin, list):
             for ci in containersin:
                 if not isinstance(ci, Tank) or not isinstance(ci, Sample):
                     raise ValueError("Sampler can only pull from containers")
-                if ci not in list(self.graph.nodes):
+                if not in_graph(self.graph, ci):
                     raise ValueError("Cannot connect to container not in graph")
         elif not isinstance(containersout, ContainerNode) or not isinstance(containersin, ContainerNode):
             raise ValueError("Sampler can only push and pull from containers")
         elif isinstance(containersin, Environment) or isinstance(containersout, Environment):
             raise ValueError("Sample can only push and pull from particle containers")
-        elif (containersin not in list(self.graph.nodes)) or (containersout not in list(self.graph.nodes)):
+        elif not in_graph(self.graph, containersin) or not in_graph(self.graph, containersout):
             raise ValueError("Cannot connect to container not in graph")
         # add edge from containers in to node
         self.containersin = containersin
         if isinstance(containersin, list):
             for ci in containersin:
-                self.graph.add_edge(ci, self)
+                connect(self.graph, ci, self)
         else:
-            self.graph.add_edge(containersin, self)
+            connect(self.graph, containersin, self)
         # add edge from node to containers out
         self.containersout = containersout
         if isinstance(containersout, list):
             for co in containersout:
-                self.graph.add_edge(self, co)
+                connect(self.graph, self, co)
         else:
-            self.graph.add_edge(self, containersout)
+            connect(self.graph, self, containersout)
         # add edge from read containers to node
         self.readcontainers = readcontainers
         if isinstance(readcontainers, list):
             for rc in readcontainers:
-                self.graph.add_edge(self, rc)
+                connect(self.graph, self, rc)
         elif readcontainers:
-            self.graph.add_edge(self, readcontainers)
+            connect(self.graph, self, readcontainers)
         self.sample = []
         pass
 
@@ -537,6 +749,7 @@ class Observer(ControlNode):
 
     """
     __metaclass__ = abc.ABCMeta
+    firing_probability = 1.0
 
     @abc.abstractmethod
     def __init__(self, graph, containersin, containersout, readcontainers=None, index=0):
@@ -546,20 +759,20 @@ class Observer(ControlNode):
             for co in containersout:
                 if not isinstance(co, Environment):
                     raise ValueError("Observer can only push to Environment")
-                if co not in list(self.graph.nodes):
+                if not in_graph(self.graph, co):
                     raise ValueError("Cannot connect to container not in graph")
         if isinstance(containersin, list):
             for ci in containersin:
                 if not isinstance(ci, Environment):
                     raise ValueError("Observer can only pull from Environment")
-                if ci not in list(self.graph.nodes):
+                if not in_graph(self.graph, ci):
                     raise ValueError("Cannot connect to container not in graph")
         elif containersin and not isinstance(containersin, ContainerNode) \
                 and not all(isinstance(ci, ContainerNode) for ci in containersin) \
                 or containersout and not isinstance(containersout, Environment) \
                 and not all(isinstance(co, Environment) for co in containersout):
             raise ValueError("Observers can only read containers nodes and write to variables")
-        elif (containersin not in list(self.graph.nodes) or (containersout not in list(self.graph.nodes))):
+        elif not in_graph(self.graph, containersin) or not in_graph(self.graph, containersout):
             raise ValueError("Cannot connect to container not in graph")
         self.containersin = containersin
         self.containersout = containersout
@@ -567,17 +780,17 @@ class Observer(ControlNode):
             raise ValueError("Observer can only read from containers")
         elif isinstance(readcontainers, list) and not all(isinstance(rc, ContainerNode) for rc in readcontainers):
             raise ValueError("Observer can only read from containers")
-        elif isinstance(readcontainers, list) and not all(rc in list(self.graph.nodes) for rc in readcontainers):
+        elif isinstance(readcontainers, list) and not all(in_graph(self.graph, rc) for rc in readcontainers):
             raise ValueError("Cannot connect to containers not in graph")
-        elif readcontainers  and readcontainers not in list(self.graph.nodes):
+        elif readcontainers  and not in_graph(self.graph, readcontainers):
             raise ValueError("Cannot connect to containers not in graph")
         # add edges from read containers to node
         self.readcontainers = readcontainers
         if isinstance(readcontainers, list):
             for rc in readcontainers:
-                self.graph.add_edge(self, rc)
+                connect(self.graph, self, rc)
         elif readcontainers:
-            self.graph.add_edge(self, readcontainers)
+            connect(self.graph, self, readcontainers)
         self.index = index
         pass
 
@@ -0,0 +1,101 @@
+"""
+Ensemble module runs many independent replicates of the same MetaChem template, each with its own seed, across a pool
+of worker processes. Each replicate builds its own graph inside the worker so only the factory, the seed and the
+returned summary cross process boundaries.
+
+"""
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import os
+import random
+
+import numpy as np
+
+from metachem.Simulate import Simulate
+
+
+class Ensemble(object):
+    """
+    A Class for running independent replicates of a template in parallel.
+
+    Parameters
+    -----------
+    factory : callable
+        Called with no arguments inside a worker to build a fresh template, any object with graph and start
+        attributes e.g. functools.partial(WellMixedTank, SCCBond(), load_type="scc"). Must be picklable, so a module
+        level function or a partial of one.
+    summary : callable
+        Called with (template, simulate) once a replicate has finished and returns the picklable summary sent back for
+        that replicate. Defaults to run_statistics.
+    transition_limit : int
+        The number of transitions each replicate runs for, 0 runs until termination.
+    workers : int
+        Number of worker processes. Defaults to the number of CPUs.
+
+    """
+
+    def __init__(self, factory, summary=None, transition_limit=0, workers=None):
+        self.factory = factory
+        self.summary = summary if summary else run_statistics
+        self.transition_limit = transition_limit
+        self.workers = workers if workers else os.cpu_count()
+
+    def run(self, seeds):
+        """
+        Runs one replicate per seed and yields the summaries as replicates complete, which is not necessarily in seed
+        order. Only twice the number of workers replicates are submitted at any time, so memory use is bounded by the
+        number of workers rather than the number of seeds.
+
+        Parameters
+        ----------
+        seeds : List<int>
+            Seeds for the replicates, used to seed random and numpy.random in the worker before the template is built.
+
+        Returns
+        -------
+        generator of (int, object)
+            Pairs of seed and replicate summary.
+        """
+        seeds = iter(seeds)
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = set()
+            for seed in seeds:
+                pending.add(self.submit(executor, seed))
+                if len(pending) >= 2 * self.workers:
+                    break
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    seed = next(seeds, None)
+                    if seed is not None:
+                        pending.add(self.submit(executor, seed))
+
+    def submit(self, executor, seed):
+        """
+        Submits a single replicate to the executor.
+        """
+        return executor.submit(run_replicate, self.factory, self.summary, self.transition_limit, seed)
+
+
+def run_replicate(factory, summary, transition_limit, seed):
+    """
+    Builds and runs a single replicate. Run inside the worker processes by Ensemble.
+
+    Returns
+    -------
+    (int, object)
+        The seed and the summary of the replicate.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    template = factory()
+    simulate = Simulate(template.graph, template.start, seed=seed)
+    simulate.run_fast(transition_limit)
+    return seed, summary(template, simulate)
+
+
+def run_statistics(template, simulate):
+    """
+    Default replicate summary, the number of transitions run and whether the replicate terminated.
+    """
+    return {"transitions": simulate.transitions, "terminated": simulate.terminated}
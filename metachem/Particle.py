@@ -1,4 +1,8 @@
+import numpy as np
+
+
 class Particle:
+    __slots__ = ()
 
     def __init__(self):
         """
@@ -16,8 +20,195 @@ class Particle:
             other particles
         located
             Boolean indicating if the Particle has or is supposed to have a location.
+
+        Particle declares no slots of its own, so subclasses without __slots__ hold these values in their instance
+        dictionary while CompactParticle stays free of one.
         """
         self.id = None
         self.location = None
         self.atom = False
-        self.located = False
\ No newline at end of file
+        self.located = False
+
+
+class CompactParticle(Particle):
+    """
+    Lightweight particle which holds no data of its own. It is a handle on a row of a ParticleArray, which stores the
+    id, location, atom and located values of every particle in numpy arrays, and reads and writes them through
+    properties. Only the store and index are kept per particle, in slots, so instances have no dictionary.
+    Subclasses must declare __slots__ = () to stay compact and can expose further columns of the store with
+    column_property.
+
+    Two handles on the same row of the same store are equal, so particles can be held and removed by the existing
+    containers.
+
+    Parameters
+    ----------
+    store : ParticleArray
+        Store holding the particle's values.
+    index : int
+        Row of the particle in the store.
+    """
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def id(self):
+        value = self.store.ids[self.index]
+        return None if value < 0 else int(value)
+
+    @id.setter
+    def id(self, value):
+        self.store.ids[self.index] = -1 if value is None else value
+
+    @property
+    def location(self):
+        row = self.store.locations[self.index]
+        return None if np.isnan(row[0]) else row.copy()
+
+    @location.setter
+    def location(self, value):
+        self.store.locations[self.index] = np.nan if value is None else value
+
+    @property
+    def atom(self):
+        return bool(self.store.atoms[self.index])
+
+    @atom.setter
+    def atom(self, value):
+        self.store.atoms[self.index] = value
+
+    @property
+    def located(self):
+        return bool(self.store.located[self.index])
+
+    @located.setter
+    def located(self, value):
+        self.store.located[self.index] = value
+
+    def __eq__(self, other):
+        return isinstance(other, CompactParticle) and other.store is self.store and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+    def __repr__(self):
+        return type(self).__name__ + "(" + str(self.index) + ")"
+
+
+def column_property(name):
+    """
+    Property exposing an extra column of a ParticleArray on a CompactParticle subclass, e.g. speed =
+    column_property("speed") for a store created with fields={"speed": float}.
+    """
+    def get(self):
+        return self.store.fields[name][self.index]
+
+    def set(self, value):
+        self.store.fields[name][self.index] = value
+
+    return property(get, set)
+
+
+class ParticleArray(object):
+    """
+    Columnar store for CompactParticles. Each value is a numpy array with a row per particle, the arrays grow by
+    doubling as particles are added. Rows are never reused, a particle's handle stays valid for the life of the store.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of rows allocated initially.
+    dimensions : int
+        Length of a particle location.
+    fields : dict<String, dtype>
+        Extra columns to store, by name and numpy dtype.
+    particle_type : type
+        CompactParticle subclass used for the handles.
+    """
+
+    def __init__(self, capacity=1024, dimensions=2, fields=None, particle_type=CompactParticle):
+        capacity = max(capacity, 1)
+        self.size = 0
+        self.particle_type = particle_type
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.locations = np.full((capacity, dimensions), np.nan)
+        self.atoms = np.zeros(capacity, dtype=bool)
+        self.located = np.zeros(capacity, dtype=bool)
+        self.fields = {name: np.zeros(capacity, dtype=dtype) for name, dtype in (fields or {}).items()}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError("Particle index out of range")
+        return self.particle_type(self, index)
+
+    def __iter__(self):
+        return (self.particle_type(self, index) for index in range(self.size))
+
+    def new(self, id=None, location=None, atom=False, located=False, **values):
+        """
+        Adds a particle to the store and returns its handle.
+
+        Parameters
+        ----------
+        id : int
+            Particle id, ids must be non negative, None for no id.
+        location : array like
+            Particle location, None for no location.
+        atom : bool
+        located : bool
+        values
+            Values for the extra fields of the store.
+
+        Returns
+        -------
+        CompactParticle
+        """
+        if self.size == len(self.ids):
+            self.grow()
+        particle = self.particle_type(self, self.size)
+        self.size = self.size + 1
+        particle.id = id
+        particle.location = location
+        particle.atom = atom
+        particle.located = located
+        for name, value in values.items():
+            self.fields[name][particle.index] = value
+        return particle
+
+    def grow(self):
+        """
+        Doubles the number of allocated rows.
+        """
+        capacity = 2 * len(self.ids)
+        self.ids = grow_array(self.ids, capacity, -1)
+        self.locations = grow_array(self.locations, capacity, np.nan)
+        self.atoms = grow_array(self.atoms, capacity, False)
+        self.located = grow_array(self.located, capacity, False)
+        self.fields = {name: grow_array(column, capacity, 0) for name, column in self.fields.items()}
+
+    def column(self, name):
+        """
+        The values of a column for all particles in the store, without copying.
+
+        Parameters
+        ----------
+        name : String
+            "ids", "locations", "atoms", "located" or the name of an extra field.
+        """
+        column = self.fields[name] if name in self.fields else getattr(self, name)
+        return column[:self.size]
+
+
+def grow_array(array, capacity, fill):
+    """
+    Copy of an array with its first dimension extended to capacity, new rows are set to fill.
+    """
+    grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
@@ -1,5 +1,9 @@
 import abc
+import copy
 import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 
 class ParticleFactory:
@@ -14,9 +18,98 @@ class ParticleFactory:
             self.seed = seed
             random.seed(self.seed)
 
-    def createParticles(self, numParticles, seed=None):
+    def createParticles(self, numParticles, seed=None, workers=1, chunk_size=None):
+        """
+        Creates a list of particles.
+
+        Parameters
+        ----------
+        numParticles : int
+            Number of particles to create.
+        seed : int
+            Seed for the factory's random draws.
+        workers : int
+            Number of worker processes, more than one splits the particles into chunks built across a process pool.
+        chunk_size : int
+            Number of particles per chunk. Each chunk is built by a copy of the factory with its own random generator,
+            seeded from a child of a SeedSequence, so the particles depend only on the seed and chunk size and not on
+            the number of workers, and no global random state is changed. Defaults to 1000 when workers are used,
+            otherwise the particles are built as a single batch.
+
+        Returns
+        -------
+        List<Particle>
+        """
         if seed:
             self.seed = seed
-            random.seed(seed)
         self.generator_size = numParticles
-        return [self.createParticle() for _ in range(self.generator_size)]
+        if workers <= 1 and chunk_size is None:
+            if seed:
+                random.seed(seed)
+            return self.createBatch(numParticles)
+        chunk_size = chunk_size if chunk_size else 1000
+        offsets = list(range(0, numParticles, chunk_size))
+        counts = [min(chunk_size, numParticles - offset) for offset in offsets]
+        seeds = np.random.SeedSequence(seed if seed else self.entropy()).spawn(len(offsets))
+        factories = [copy.copy(self) for _ in offsets]
+        if workers <= 1:
+            chunks = map(create_chunk, factories, offsets, counts, seeds)
+            return [particle for chunk in chunks for particle in chunk]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(create_chunk, factories, offsets, counts, seeds)
+            return [particle for chunk in chunks for particle in chunk]
+
+    def createBatch(self, numParticles, rng=None):
+        """
+        Creates numParticles particles in one go. Defaults to calling createParticle for each, factories which can
+        generate many particles at once should override it.
+
+        Parameters
+        ----------
+        numParticles : int
+            Number of particles to create.
+        rng : random.Random
+            Generator for the batch's random draws, given for chunks. The draws createParticle makes from the random
+            module are taken from rng's state, and the random module's own state is put back afterwards.
+        """
+        if rng is None:
+            return [self.createParticle() for _ in range(numParticles)]
+        state = random.getstate()
+        random.setstate(rng.getstate())
+        try:
+            return [self.createParticle() for _ in range(numParticles)]
+        finally:
+            rng.setstate(random.getstate())
+            random.setstate(state)
+
+    def startChunk(self, offset, seed):
+        """
+        Prepares a copy of the factory to build the chunk of particles starting at offset.
+
+        Parameters
+        ----------
+        offset : int
+            Position of the chunk's first particle in the full list.
+        seed : numpy.random.SeedSequence
+            Seed for the chunk.
+
+        Returns
+        -------
+        random.Random
+            Generator for the chunk, passed to createBatch.
+        """
+        return random.Random(int(seed.generate_state(1)[0]))
+
+    def entropy(self):
+        """
+        Entropy used to derive the chunk seeds, drawn from the factory's random source.
+        """
+        return random.getrandbits(64)
+
+
+def create_chunk(factory, offset, count, seed):
+    """
+    Builds one chunk of particles with a copy of a factory. Run inside the worker processes by createParticles.
+    """
+    rng = factory.startChunk(offset, seed)
+    return factory.createBatch(count, rng)
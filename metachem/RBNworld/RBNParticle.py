@@ -22,9 +22,13 @@ class RBNParticle(Particle):
         self.maxSizeAtom = maxSizeAtom
 
     def checkSpikes(self):
-        broken_bond = None
         # calculate intensity of all spikes in molecule
         self.calculateIntensitySpikes(self.atoms)
+        return self.findBrokenBond()
+
+    def findBrokenBond(self):
+        """ Finds the first unstable bond from the current spike intensities, without recalculating them """
+        broken_bond = None
         # check stability of all bonds
         for bond in self.bonds:
             # compare intensity of spikes in each bond
@@ -163,7 +167,19 @@ class RBNParticle(Particle):
 
 class WatsonRBNParticleFactory(ParticleFactory):
 
-    def __init__(self, numNodes, numConnections, index_start=0, seed=0, maxSizeAtoms=100):
+    def __init__(self, numNodes, numConnections, index_start=0, seed=0, maxSizeAtoms=100, rng=None):
+        """
+        Factory generating single atom RBN particles with Watson spikes.
+
+        Parameters
+        ----------
+        rng :   numpy.random.RandomState
+            Generator used for all random draws when building RBNs. Defaults to the global numpy.random state. Giving
+            a seed to createParticle or createParticles replaces it with a RandomState seeded with that seed.
+
+        createParticles builds the RBNs in batches of batch_size, drawing their structure as arrays, and can build
+        them across a process pool with workers, see ParticleFactory.createParticles.
+        """
         super(WatsonRBNParticleFactory, self).__init__()
         self.atom_num_nodes = numNodes
         self.atom_num_connections = numConnections
@@ -171,17 +187,217 @@ class WatsonRBNParticleFactory(ParticleFactory):
         self.seed = seed
         self.spikeType = "Watson"
         self.maxSizeAtoms = maxSizeAtoms
+        self.rng = rng if rng is not None else random
+        self.batch_size = 1024
 
     def createParticle(self, seed=None):
         super(WatsonRBNParticleFactory, self).createParticle(seed)
-        rbn = RBN(self.atom_num_nodes, self.atom_num_connections, self.index, self.spikeType)
+        if seed:
+            self.rng = random.RandomState(seed)
+        rbn = RBN(self.atom_num_nodes, self.atom_num_connections, self.index, self.spikeType, rng=self.rng)
         self.index = self.index + 1
         return RBNParticle([rbn], [], [(spike, rbn) for spike in rbn.spikeArray], self.spikeType, self.maxSizeAtoms)
 
+    def createParticles(self, numParticles, seed=None, workers=1, chunk_size=None):
+        if seed:
+            self.rng = random.RandomState(seed)
+        start = self.index
+        particles = super(WatsonRBNParticleFactory, self).createParticles(numParticles, seed, workers, chunk_size)
+        self.index = start + numParticles
+        return particles
+
+    def createBatch(self, numParticles, rng=None):
+        """
+        Creates numParticles particles, drawing the connections, boolean functions and initial states of up to
+        batch_size RBNs at a time as arrays from rng, the factory's generator if not given.
+        """
+        rng = rng if rng is not None else self.rng
+        particles = []
+        for start in range(0, numParticles, self.batch_size):
+            count = self.batch_size if start + self.batch_size <= numParticles else numParticles - start
+            n, k = self.atom_num_nodes, self.atom_num_connections
+            connections = argsort(rng.random_sample((count, n, n)), axis=2)[:, :, :k]
+            booleanFuncs = rng.randint(0, 2, (count, n, 2 ** k))
+            states = rng.randint(0, 2, (count, n))
+            for structure in zip(connections, booleanFuncs, states):
+                rbn = RBN(n, k, self.index, self.spikeType, rng=rng, structure=structure)
+                self.index = self.index + 1
+                particles.append(RBNParticle([rbn], [], [(spike, rbn) for spike in rbn.spikeArray], self.spikeType,
+                                             self.maxSizeAtoms))
+        return particles
+
+    def startChunk(self, offset, seed):
+        self.index = self.index + offset
+        return random.RandomState(seed.generate_state(1))
+
+    def entropy(self):
+        return int(self.rng.randint(0, 2 ** 31))
+
+
+class BatchRBNEngine:
+    """
+    Runs the intensity calculation of many molecules at once. The current states of every rbn in the molecules are
+    stacked into one vector, and the compiled wiring of each rbn is translated to positions in that vector, so a
+    synchronous update of all molecules is a single gather and table lookup. The results are the same as calling
+    calculateIntensitySpikes on each molecule.
+
+    Parameters
+    ----------
+    molecules : List<RBNParticle>
+        Molecules to run, all rbns must have the same number of connections per node.
+    """
+
+    def __init__(self, molecules):
+        self.molecules = molecules
+        self.rbns = []
+        self.offsets = {}
+        for molecule in molecules:
+            for rbn in molecule.atoms:
+                self.addRBN(rbn)
+        self.inMolecules = len(self.rbns)
+        self.moleculeSize = int(sum([rbn.n for rbn in self.rbns]))
+        self.k = self.rbns[0].k if self.rbns else 0
+        if any([rbn.k != self.k for rbn in self.rbns]):
+            raise ValueError("Cannot batch rbns with different numbers of connections")
+        inputs = []
+        tables = []
+        # Rbns feeding the molecules from outside them are not updated, they copy their own state each step
+        hold = arange(2 ** self.k) & 1
+        position = 0
+        while position < len(self.rbns):
+            rbn = self.rbns[position]
+            if position < self.inMolecules:
+                sources, local, table = rbn.compileWiring()
+                for source in sources:
+                    self.addRBN(source)
+                positions = concatenate([self.offsets[id(source)] + arange(source.n) for source in sources])
+                inputs.append(positions[local])
+                tables.append(table)
+            else:
+                own = self.offsets[id(rbn)] + arange(rbn.n)
+                inputs.append(tile(own[:, newaxis], (1, self.k)))
+                tables.append(tile(hold, (rbn.n, 1)))
+            position += 1
+        self.size = int(sum([rbn.n for rbn in self.rbns]))
+        self.inputs = concatenate(inputs) if inputs else empty((0, self.k), dtype=int)
+        self.table = concatenate(tables) if tables else empty((0, 2 ** self.k), dtype=int)
+
+    def addRBN(self, rbn):
+        if id(rbn) not in self.offsets:
+            self.offsets[id(rbn)] = int(sum([other.n for other in self.rbns]))
+            self.rbns.append(rbn)
+
+    def run(self, steps, zero=True):
+        """
+        Updates all rbns synchronously without changing their stored states.
+
+        Parameters
+        ----------
+        steps : int
+            Number of updates.
+        zero : bool
+            Start the rbns of the molecules from all nodes off, as calculateIntensitySpikes does, otherwise start from
+            their current states.
+
+        Returns
+        -------
+        numpy.ndarray
+            The (steps + 1) x total nodes matrix of states, first row the starting state.
+        """
+        history = empty((steps + 1, self.size), dtype=int)
+        history[0] = concatenate([rbn.current for rbn in self.rbns])
+        if zero:
+            history[0, :self.moleculeSize] = 0
+        rows = arange(self.size)
+        powers = 2 ** arange(self.k)
+        for step in range(steps):
+            history[step + 1] = self.table[rows, history[step][self.inputs] @ powers]
+        return history
+
+    def calculateIntensitySpikes(self):
+        """
+        Recalculates the intensity of every spike in the molecules, each molecule run for its maxSizeAtom + 30
+        updates from all nodes off.
+        """
+        if not self.molecules:
+            return
+        history = self.run(max([molecule.maxSizeAtom for molecule in self.molecules]) + 30)
+        for molecule in self.molecules:
+            steps = molecule.maxSizeAtom + 30
+            for rbn in molecule.atoms:
+                origStates = rbn.states
+                offset = self.offsets[id(rbn)]
+                rbn.states = history[:steps + 1, offset:offset + rbn.n]
+                molecule.analyseAtom(rbn)
+                rbn.setState(origStates, np.size(origStates, 0) - 1)
+
+
+class StateHistory:
+    """
+    State matrix of an rbn, kept in a preallocated (capacity, n) uint8 array of which the first length rows are in
+    use. Appending writes the next row and popping moves the cursor back, the array doubles when full. Views handed
+    out keep their contents, rows they cover are copied to a new array before being overwritten.
+
+    Parameters
+    ----------
+    n : int
+        Number of nodes in the rbn.
+    capacity : int
+        Number of rows allocated initially.
+    """
+
+    def __init__(self, n, capacity=64):
+        self.rows = empty((capacity, n), dtype=uint8)
+        self.length = 0
+        self.shared = 0  # Rows covered by views handed out
+
+    def view(self):
+        """ The rows in use, a single row as a vector """
+        self.shared = self.length if self.length > self.shared else self.shared
+        if self.length == 1:
+            return self.rows[0]
+        return self.rows[:self.length]
+
+    def last(self):
+        """ The most recent row, only valid until the history next changes """
+        return self.rows[self.length - 1]
+
+    def append(self, state):
+        if self.length < self.shared or self.length == len(self.rows):
+            self.reallocate(2 * len(self.rows) if self.length == len(self.rows) else len(self.rows))
+        self.rows[self.length] = state
+        self.length += 1
+
+    def pop(self):
+        self.length -= 1
+        return self.rows[self.length].copy()
+
+    def truncate(self, length):
+        """ Keeps only the first length rows """
+        self.length = length
+
+    def reset(self, stateMatrix):
+        """ Replaces the history with the rows of stateMatrix, a vector is a single row """
+        stateMatrix = atleast_2d(stateMatrix)
+        if self.shared or len(stateMatrix) > len(self.rows):
+            self.rows = empty((max([len(self.rows), 2 * len(stateMatrix)]), self.rows.shape[1]), dtype=uint8)
+            self.shared = 0
+        self.rows[:len(stateMatrix)] = stateMatrix
+        self.length = len(stateMatrix)
+
+    def reallocate(self, capacity):
+        rows = empty((capacity, self.rows.shape[1]), dtype=uint8)
+        rows[:self.length] = self.rows[:self.length]
+        self.rows = rows
+        self.shared = 0
+
+    def __getstate__(self):
+        return {"rows": self.rows[:max([self.length, 1])].copy(), "length": self.length, "shared": 0}
+
 
 class RBN:
 
-    def __init__(self, numNodes, numConnections, rbnNumber, spikeType="Watson", seed=None):
+    def __init__(self, numNodes, numConnections, rbnNumber, spikeType="Watson", seed=None, rng=None, structure=None):
         """
         Method which initializes the rbn by assigning internal variables there value and calling a method which
         creates the internal structure of the rbn
@@ -194,6 +410,11 @@ class RBN:
             Number of incoming edges for each node
         rbnNumber       :   int
             ID number of rbn for tracking
+        rng             :   numpy.random.RandomState
+            Generator used for all random draws in building the rbn. Defaults to the global numpy.random state.
+        structure       :   (array, array, array)
+            Connection matrix (n x k), boolean function matrix (n x 2^k) and initial state (n) of the rbn, drawn
+            when not given.
 
         Returns
         -------
@@ -203,45 +424,47 @@ class RBN:
         self.n = numNodes
         self.k = numConnections
         self.rbnNumber = rbnNumber
+        self.id = rbnNumber
         self.nodeArray = array([], dtype=Node)  # Create array which can be filled with nodes
         self.spikeArray = array([], dtype=WatsonSpike)
         self.bonded = False  # Boolean used to indicate if rbn is bonded to another rbn
         self.bondedRBNs = []
-        self.states = array([], dtype=int)  # Matrix to hold states of each node
+        self.history = StateHistory(numNodes)  # Matrix to hold states of each node, read and set through states
         self.numIterations = 0  # Number of times rbn has been run
         self.activeSpikes = array([], dtype=int)  # Stores the spike numbers of the spikes which are currently
         # involved in bonds
         self.type = 0  # The type of rbn is determined by the number of spikes it has
         self.spikeType = spikeType
         self.seed = seed
-        self.createRBN()
+        self.rng = rng if rng is not None else random
+        self.current = zeros(self.n, dtype=int)  # Current state of each node, read and written by the nodes
+        self.wiring = None  # Compiled connections and boolean functions, see compileWiring
+        self.createRBN(structure)
         self.generateSpikes()
 
-    def createRBN(self):
+    def createRBN(self, structure=None):
         """
         This method creates a rbn by generating an array of nodes and assigning each node its connections to other
         nodes and its internal function
         """
-        # First generate connection matrix
-        con = apply_along_axis(random.permutation, 1, tile(range(self.n), (self.n, 1)))[:, 0:self.k]
-        # print ("The original connection matrix is: " + str(con) + "\n")
-
-        # Next generate boolean function matrix which maps how node reacts to inputs
-        booleanFuncs = random.randint(0, 2, (self.n, 2 ** self.k))
+        if structure is None:
+            # First generate connection matrix
+            con = apply_along_axis(self.rng.permutation, 1, tile(range(self.n), (self.n, 1)))[:, 0:self.k]
+            # Next generate boolean function matrix which maps how node reacts to inputs
+            booleanFuncs = self.rng.randint(0, 2, (self.n, 2 ** self.k))
+            initial = None
+        else:
+            con, booleanFuncs, initial = structure
 
-        # Fill array with appropriate number of nodes and give each node its
-        # connections
+        # Fill array with appropriate number of nodes and give each node its connections
+        self.nodeArray = empty(self.n, dtype=object)
         for i in range(self.n):
-            self.nodeArray = append(self.nodeArray, Node(i, self, booleanFuncs[i,], self.k))
-
+            state = None if initial is None else initial[i]
+            self.nodeArray[i] = Node(i, self, booleanFuncs[i,], self.k, state)
         for i in range(self.n):
-            # Generate a new node object
-            # self.nodeArray = append(self.nodeArray,node.Node(i,self,booleanFuncs[i,],self.k))
-            for j in range(self.k):
-                # Add connections to newly generated node
-                # print ("The node number to add is: " + str(con[i,j]) + "\n")
-                self.nodeArray[i].addConnection(self.nodeArray[con[i, j]])
-            self.states = append(self.states, self.nodeArray[i].state)  # Add state of node to create initial state
+            self.nodeArray[i].connections = self.nodeArray[con[i, 0:self.k]]
+        # Add state of nodes to create initial state
+        self.states = self.current.copy()
 
     def generateSpikes(self):
         if self.spikeType == "Watson":
@@ -270,7 +493,7 @@ class RBN:
         # First generate set of nodes by randomly sorting the list of node numbers
         setOfNodes = arange(self.n)
 
-        random.shuffle(setOfNodes)
+        self.rng.shuffle(setOfNodes)
 
         # While the set of nodes is not empty
         while size(setOfNodes) != 0:
@@ -288,13 +511,13 @@ class RBN:
             # While there are still nodes in the input list
             while (size(inputList) != 0):
                 # The next node is randomly selected from the input lis
-                nextNodeIndex = random.randint(0, size(inputList))
+                nextNodeIndex = self.rng.randint(0, size(inputList))
                 nextNode = inputList[nextNodeIndex]
                 # The next node is then removed from the input list
                 inputList = delete(inputList, nextNodeIndex)
 
                 if nextNode.nodeNumber in setOfNodes:
-                    indexToDelete = int(where(setOfNodes == nextNode.nodeNumber)[0])
+                    indexToDelete = int(where(setOfNodes == nextNode.nodeNumber)[0][0])
                     setOfNodes = delete(setOfNodes, indexToDelete)
                     self.spikeArray[size(self.spikeArray) - 1].addNode(self.nodeArray[nextNode.nodeNumber])
                     node = nextNode
@@ -327,9 +550,9 @@ class RBN:
             after this the state of the nodes is reset
         """
 
-        if ndim(self.states) > 1:
+        if self.history.length > 1:
             # print ("Original states is: \n" + str(self.states) + "\n" )
-            self.states = self.states[0,]
+            self.history.truncate(1)
             # print (" New states is: \n" + str(self.states) + "\n" )
             self.numIterations = 0
 
@@ -337,8 +560,6 @@ class RBN:
                 self.nodeArray[i].changeState(self.states[i])
         else:
             # print ("Original states is: \n" + str(self.states) + "\n" )
-            self.states = self.states
-            # print (" New states is: \n" + str(self.states) + "\n" )
             self.numIterations = 0
 
             for i in range(size(self.n)):
@@ -355,37 +576,42 @@ class RBN:
             length of the attractor cycle of the rbn or -1 for an error in calculating the cycle length
 
         """
-        #
-        originalStateMatrix = self.states  # Store the original matrix
+        attractor = self.findAttractor()
+        return -1 if attractor is None else attractor[1]
+
+    def findAttractor(self, maxUpdates=None):
+        """
+        Runs the rbn from the current state of its nodes until a state repeats, keeping the step each state was first
+        seen in a dictionary keyed by the state's bytes, so the transient and cycle are found in one pass. The state
+        matrix and node states are restored afterwards.
+
+        Parameters
+        ----------
+        maxUpdates : int
+            Number of updates to try, defaults to n * (n + 30), the budget of the former restart search.
+
+        Returns
+        -------
+        (int, int, numpy.ndarray)
+            Step the cycle starts at, cycle length and the cycle length x n matrix of the states in the cycle, or None
+            if no state repeats within maxUpdates.
+        """
+        maxUpdates = self.n * (self.n + 30) if maxUpdates is None else maxUpdates
+        originalStateMatrix = self.states
         originalNumIteration = self.numIterations
-        numAttempts = self.n
-        numRBNUpdate = self.n + 30
-        # print ("The number of attempts is: " + str(numAttempts) + "\n")
-        for i in range(numAttempts):
-            for j in range(i):
-                self.updateRBN()
-            self.selectMostRecentState()
-            # stateOfRBN = self.states
-            # Run rbn for this number of time
-            for k in range(1, numRBNUpdate):
-                self.updateRBN()
-                stateOfRBN = self.states
-                # print ("The state of the rbn is now: " + str(spike.rbn.states) + "\n")
-                # print ("The first row is: " + str(stateOfRBN[0,:]) + "\n")
-                # print ("The last row is: " + str(stateOfRBN[k,:]) + "\n")
-                if array_equal(stateOfRBN[0, :], stateOfRBN[k, :]):
-                    self.popState()
-                    #       print ("The cycle length is: " + str(spike.rbn.numIterations) + "\n")
-                    # Need to pop last state
-                    # for i in range(size(spike.nodeList)):
-                    # print ("Node in spike: " + str(spike.nodeList[i].nodeNumber) + "\n")
-                    # print ("The state matrix is: " + str(self.states) + "\n")
-                    count = k
-                    self.setState(originalStateMatrix, originalNumIteration)
-                    return count
-            self.zeroRBN()
-
-        return -1
+        self.history.reset(self.current)
+        firstSeen = {self.history.last().tobytes(): 0}
+        attractor = None
+        for step in range(1, maxUpdates + 1):
+            self.updateRBN()
+            key = self.history.last().tobytes()
+            if key in firstSeen:
+                start = firstSeen[key]
+                attractor = (start, step - start, self.history.rows[start:step].copy())
+                break
+            firstSeen[key] = step
+        self.setState(originalStateMatrix, originalNumIteration)
+        return attractor
 
     def returnMostRecentNodeState(self, nodeNumber):
 
@@ -407,17 +633,11 @@ class RBN:
         # print ("Number of iteration before reset is: " + str(self.numIterations) + "\n")
         # print ("The rbn number is: " + str(self.rbnNumber) + "\n")
         self.numIterations = 0
-        if self.states.ndim == 1:
-            for i in range(self.n):
-                self.nodeArray[i].state = self.states[i]
-            # print ("In this area \n")
-            return
-        else:
-            self.states = self.states[size(self.states, 0) - 1,]
+        if self.history.length > 1:
+            self.history.reset(self.history.last())
         # print ("The state matrix is: "  + str(self.states) + "\n")
 
-        for i in range(size(self.states)):
-            self.nodeArray[i].state = self.states[i]
+        self.current[:] = self.history.last()
 
     def popState(self):
         """ This function removes state given by iterNumber and returns the state value
@@ -425,17 +645,10 @@ class RBN:
         """
         # print ("The number of rows is: " + str(size(self.states,0)) + "\n")
         # print ("The number of iterations is: " + str(self.numIterations) + "\n")
-        state = self.states[size(self.states, 0) - 1,]
-        self.states = delete(self.states, size(self.states, 0) - 1, 0)
+        state = self.history.pop()
         self.numIterations -= 1
         # print ("Number of iterations is: " + str(self.numIterations) + "\n")
-        if self.numIterations == 0:
-            self.states = self.states.flatten()
-            for i in range(self.n):
-                self.nodeArray[i].changeState(self.states[i])
-        else:
-            for i in range(self.n):
-                self.nodeArray[i].changeState(self.states[size(self.states, 0) - 1, i])
+        self.changeStates(self.history.last())
         # print ("The state to be returned is: " + str(state) + "\n")
         return state
 
@@ -448,45 +661,81 @@ class RBN:
         # print ("New num iters is: " + str(numIterations) + "\n")
         self.numIterations = numIterations
         self.states = stateMatrix
-        if self.states.ndim == 1:
-            for i in range(self.n):
-                self.nodeArray[i].changeState(stateMatrix[i])
-        else:
-            for i in range(self.n):
-                # print ("States is: " + str(self.states) + "\n")
-                # print ("Rows: " + str(size(self.states,0)) + "\n")
-                self.nodeArray[i].changeState(stateMatrix[(size(self.states, 0) - 1), i])
+        self.changeStates(self.history.last())
         self.numIterations = size(self.states, 0) - 1
 
     def zeroRBN(self):
-        self.states = array([], dtype=int)
+        self.history.reset(zeros(self.n, dtype=int))
         self.numIterations = 0
-        for i in range(self.n):
-            self.states = append(self.states, 0)
-        for i in range(self.n):
-            self.nodeArray[i].state = 0
+        self.current[:] = 0
 
     def updateRBN(self):
-        """ This function works by calling the update state function for each
-            node then appending thew new state of each node to a new
-            row in the state matrix
+        """ This function updates every node synchronously, gathering the current state of each node's inputs and
+            looking up its boolean function, then appends the new state as a new row in the state matrix
         """
-        # Generate new array to store the new state of node
-        newStates = empty([self.n], dtype=int)
-        for i in range(self.n):
-            origState = self.nodeArray[i].state
-            self.nodeArray[i].calculateState()
-            # print ("Return state is: " + str(self.nodeArray[i].returnState()) + "\n")
-            newStates[i] = self.nodeArray[i].state
-            self.nodeArray[i].state = origState
+        sources, inputs, table = self.compileWiring()
+        if len(sources) == 1:
+            inputStates = self.current[inputs]
+        else:
+            inputStates = concatenate([rbn.current for rbn in sources])[inputs]
+        newStates = table[arange(self.n), inputStates @ (2 ** arange(self.k))]
 
         self.numIterations += 1
         # Append new states to state matrix
-        self.states = vstack((self.states, newStates))
+        self.history.append(newStates)
 
         # Update nodes with new state
-        for i in range(self.n):
-            self.nodeArray[i].state = newStates[i]
+        self.current[:] = newStates
+
+    def compileWiring(self):
+        """ Returns the connections and boolean functions of the nodes as arrays, the rbns supplying inputs with this
+            rbn first, the n x k matrix of input positions in the concatenated current states of those rbns and the
+            n x 2^k truth table. Cached until a connection changes.
+        """
+        if self.wiring is None:
+            sources = [self]
+            offsets = {id(self): 0}
+            inputs = empty((self.n, self.k), dtype=int)
+            for i in range(self.n):
+                for j in range(self.k):
+                    connectedNode = self.nodeArray[i].connections[j]
+                    if id(connectedNode.rbn) not in offsets:
+                        offsets[id(connectedNode.rbn)] = sum([rbn.n for rbn in sources])
+                        sources.append(connectedNode.rbn)
+                    inputs[i, j] = offsets[id(connectedNode.rbn)] + connectedNode.nodeNumber
+            table = array([node.boolFunc for node in self.nodeArray], dtype=int)
+            self.wiring = (sources, inputs, table)
+        return self.wiring
+
+    def changeStates(self, newStates):
+        """ Sets the state of every node, as Node.changeState """
+        invalid = (newStates != 0) & (newStates != 1)
+        if invalid.any():
+            print("Error invalid state: " + str(newStates) + "\n")
+            newStates = where(invalid, 1, newStates)
+        self.current[:] = newStates
+
+    @property
+    def states(self):
+        """ The state matrix, one row per update, a single row is returned as a vector. This is a view on the
+            history, later appends will not change it """
+        return self.history.view()
+
+    @states.setter
+    def states(self, stateMatrix):
+        self.history.reset(stateMatrix)
+
+    def __setstate__(self, state):
+        """ Rbns pickled before node states were held by the rbn take their current state from the state matrix,
+            and before the state history was kept take it from the pickled matrix """
+        self.__dict__.update(state)
+        if "history" not in state:
+            self.history = StateHistory(self.n)
+            self.history.reset(self.__dict__.pop("states"))
+        if "current" not in state:
+            self.current = array(self.history.last(), dtype=int)
+        if "wiring" not in state:
+            self.wiring = None
 
     def rbnBonded(self, spikeNum, bondedRBN):
         """ This function adds a spike to the list of spikes involved in a bond """
@@ -498,14 +747,14 @@ class RBN:
         """ This function appends a state passed in as an argument and
             increments number of states and updates node values
         """
-        self.states = vstack((self.states, state))
+        self.history.append(state)
 
         # print ("The number of iterations is: " + str(self.numIterations) + "\n")
-        for i in range(self.n):
-            if self.states[size(self.states, 0) - 1, i] != 0 and self.states[size(self.states, 0) - 1, i] != 1:
-                print("Error the most recent state is \n" + str(self.states) + "\n")
-            self.nodeArray[i].changeState(self.states[size(self.states, 0) - 1, i])
-        self.numIterations += size(self.states, 0) - 1
+        mostRecent = self.history.last()
+        if ((mostRecent != 0) & (mostRecent != 1)).any():
+            print("Error the most recent state is \n" + str(self.states) + "\n")
+        self.changeStates(mostRecent)
+        self.numIterations += self.history.length - 1
 
     def rbnUnbonded(self, spikeNum, bondedRBN):
         """ This function removes a spike from the list of spikes involved in a bond
@@ -529,22 +778,47 @@ class RBN:
 class Node:
     """ A node is a building block of a rbn it takes k number of connections from other nodes
         and has a boolean function which determines how the state of the node changes
-        in response to the state of its inputs
+        in response to the state of its inputs. The state of the node is held in the current state vector of its rbn
+        and the rbn updates all nodes at once, so a node is a view onto the rbn's arrays
     """
 
-    def __init__(self, nodeNumber, rbn, boolFunc, numConnections):
+    def __init__(self, nodeNumber, rbn, boolFunc, numConnections, state=None):
         """ This method initializes the node object with its node number, rbnNumber
-            and function
+            and function, the initial state is drawn at random unless given
         """
         self.nodeNumber = nodeNumber
         self.rbn = rbn  # rbn node is part of
-        self.state = random.randint(0, 2)
+        self.state = rbn.rng.randint(0, 2) if state is None else state
         self.boolFunc = boolFunc
         self.connections = array([], dtype=Node)
 
         self.numConnections = numConnections
         self.bonded = False  # This is triggered if the rbn is involved in a bond
 
+    @property
+    def state(self):
+        return self.rbn.current[self.nodeNumber]
+
+    @state.setter
+    def state(self, value):
+        self.rbn.current[self.nodeNumber] = value
+
+    @property
+    def connections(self):
+        return self._connections
+
+    @connections.setter
+    def connections(self, value):
+        self._connections = value
+        self.rbn.wiring = None
+
+    def __setstate__(self, state):
+        """ Nodes pickled before their state was held by the rbn carry a state of their own, which is dropped """
+        state.pop("state", None)
+        if "connections" in state:
+            state["_connections"] = state.pop("connections")
+        self.__dict__.update(state)
+
     def addConnection(self, inputNode):
         """ This method adds an input to the node it takes the
             input node number and the rbn number the node is part of
@@ -614,6 +888,7 @@ class Node:
         for i in range(self.numConnections):
             if self.connections[i] == changedConnection:
                 self.connections[i] = newConnection
+                self.rbn.wiring = None
                 break
 
     def involvedInBond(self, changedConnection, newConnection):
@@ -636,6 +911,7 @@ class Node:
             if self.connections[i].rbn.rbnNumber != self.rbn.rbnNumber:  # Search until connection to other rbn is found
                 # Once found replace the connection with the new node
                 self.connections[i] = expectedNode
+                self.rbn.wiring = None
 
 
 class WatsonSpike:
@@ -851,98 +1127,52 @@ def findMolecularIntensity(spike):
 
 
 def findMolecularAttractorCycle(spike):
-    for i in range(size(spike.RBN.states, 0)):
-        for j in range(i + 1, size(spike.RBN.states, 0)):
-            # print ("The state matrix is currently: " + str(spike.rbn.states) + "\n")
-            # print ("First row: " + str(spike.rbn.states[i,:]) + "\n")
-            # print ("Second row: " + str(spike.rbn.states[j,:]) + "\n")
-            if array_equal(spike.RBN.states[i, :], spike.RBN.states[j, :]):
-                # print ("The spike number is: " + str(spike.spikeNumber) + "\n")
-                # print ("The rbn number is: " + str(spike.rbn.rbnNumber) + "\n")
-                # print ("Returning:\n" + str(spike.rbn.states[i:j,]) + "\n")
-                return spike.RBN.states[i:j, ]
+    cycle = findRepeatedState(spike.RBN.states)
+    if cycle is not None:
+        start, length = cycle
+        return spike.RBN.states[start:start + length, ]
+
+
+def findRepeatedState(states):
+    """
+    Finds the earliest row of a state matrix which occurs again later, and its first reoccurrence, in one pass keeping
+    the first and second occurrence of each row keyed by its bytes.
+
+    Returns
+    -------
+    (int, int)
+        Row the cycle starts at and cycle length, or None if no row repeats.
+    """
+    states = atleast_2d(states)
+    firstSeen = {}
+    cycle = None
+    for j in range(size(states, 0)):
+        i = firstSeen.setdefault(states[j].tobytes(), j)
+        if i != j and (cycle is None or i < cycle[0]):
+            cycle = (i, j - i)
+    return cycle
 
 
 def findUnbondedAttractorCycle(spike):
-    # We will run rbn for n + 30 times, where n is number of nodes in RBM
-
-    numAttempts = spike.RBN.n
-    numRBNUpdate = spike.RBN.n + 30
-    # print ("The number of attempts is: " + str(numAttempts) + "\n")
-    for i in range(numAttempts):
-        # print ("Initial state is: " + str(stateOfRBN) + "\n")
-        for j in range(i):
-            # print ("Inside for loop \n")
-            spike.RBN.updateRBN()
-        spike.RBN.selectMostRecentState()
-        # print ("The states are now: " + str(spike.rbn.states) + "\n")
-        # print ("The other matrix has the value: " + str(stateOfRBN) + "\n")
-
-        # Run rbn for this number of time
-        for k in range(1, numRBNUpdate):
-            spike.RBN.updateRBN()
-            stateOfRBN = spike.RBN.states
-            # print ("The state of the rbn is now: " + str(spike.rbn.states) + "\n")
-            # print ("The first row is: " + str(stateOfRBN[0,:]) + "\n")
-            # print ("The last row is: " + str(stateOfRBN[k,:]) + "\n")
-            if array_equal(stateOfRBN[0, :], stateOfRBN[k, :]):
-                spike.RBN.popState()
-                # print ("The cycle length is: " + str(spike.rbn.numIterations) + "\n")
-
-                # Need to pop last state
-                # for i in range(size(spike.nodeList)):
-                # print ("Node in spike: " + str(spike.nodeList[i].nodeNumber) + "\n")
-                # print ("The states are: \n" + str(spike.rbn.states) + "\n")
-                return spike.RBN.states
-
-        spike.RBN.resetRBN()
-        # print ("After fail states: " + str(spike.rbn.states) + " \n")
+    attractor = spike.RBN.findAttractor()
+    if attractor is not None:
+        return attractor[2]
 
 
 def newFinalStage(states, spike):
-    # Fist store list node number
-    nodeNumbers = []
-    for i in range(size(spike.nodeList)):
-        nodeNumbers.append(spike.nodeList[i].nodeNumber)
-    # print ("The node numbers are: " + str(nodeNumbers) + "\n")
-    # print ("Number of columns: " + str(size(states,1)) + "\n")
-    # print ("Number of rows: " + str(size(states,0)) + "\n")
-    # print ("The states are \n " + str(states) + "\n")
-    # print ("Number of dimensions is: " + str(states.ndim) + "\n")
-
+    """ Intensity of a spike from the states of an attractor cycle, nodes of the spike which are on throughout the
+        cycle count +1 and nodes which are off throughout count -1, 'a' if no cycle was found
+    """
     # First check that a cycle has been found if not then return a string to indicate failure
     if states is None:
         return 'a'
+    return cycleIntensity(states, [node.nodeNumber for node in spike.nodeList])
 
-    if states.ndim == 1:
-        states = atleast_2d(states)
-    intensity = 0
-    # Go through each column
-    for i in range(size(states, 1)):
-        # Go through each row
-        # print ("Column number " + str(i) +  "\n" )
-        currentSum = 0
-        if i in nodeNumbers:
-            # print ("Starting value for sum: " + str(currentSum) + "\n")
-            for j in range(size(states, 0)):
-                # print ("State matrix is: " + str(states) + "\n")
-                # print ("Row number " + str(j) +  "\n" )
-                # print (" Element value is: " + str(states[j,i]) + "\n")
-                if states[j, i] == 1:
-                    currentSum += 1
-                    # print ("Current sum value: " + str(currentSum) + "\n")
-                else:
-                    currentSum -= 1
-                    # print ("Current sum value: " + str(currentSum) + "\n")
-
-            # print ("Current sum final value: " + str(currentSum) + "\n")
-            if currentSum == size(states, 0):
-                intensity += 1
-            elif currentSum == (size(states, 0) * -1):
-                intensity -= 1
 
-    # print ("The intensity is: " + str(intensity) + "\n")
-    return intensity
+def cycleIntensity(states, nodeNumbers):
+    """ Intensity of a set of nodes from the cycle length x n matrix of states of an attractor cycle """
+    columns = atleast_2d(states)[:, unique(nodeNumbers)]
+    return int(all(columns == 1, axis=0).sum() - all(columns != 1, axis=0).sum())
 
 
 def findMolecularIntensityDebug(spike):
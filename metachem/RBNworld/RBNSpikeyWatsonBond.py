@@ -1,5 +1,5 @@
 from metachem import Subgraph, CoreNode, CoreContainer
-from metachem.RBNworld import RBNParticle
+from metachem.RBNworld import RBNParticle, BatchRBNEngine
 import numpy as np
 
 
@@ -8,29 +8,26 @@ class RBNSpikeyWatsonBond(Subgraph):
     def __init__(self, controls_in=1, controls_out=1, links=1):
         super(RBNSpikeyWatsonBond, self).__init__(controls_in, controls_out, links)
 
-        # create envo container and link sample
-        bb_container = CoreContainer.ListEnvironment(self.graph)
-        link_sample = CoreContainer.LinkSample(self.graph)
-
-        # create nodes
-        spikes_check = SpikeDecision(self.graph, link_sample)
-        bonding_spikes = WatsonSpikeBond(self.graph, link_sample, link_sample)
-        stability = SpikeStabilityObservation(self.graph, bb_container, bb_container, link_sample)
-        break_check = SpikeDecision(self.graph, bb_container)
-        bond_break = SpikeBondBreak(self.graph, link_sample, link_sample, bb_container)
-
-        # add dummy action node which does nothing to act as join for decisions
-        null_sample = CoreNode.Sample(self.graph)
-        null_act = CoreNode.Action(self.graph, null_sample, null_sample)
-
-        # link up subgraph nodes
-        self.graph.add_edge(spikes_check, bonding_spikes)
-        self.graph.add_edge(spikes_check, null_act)
-        self.graph.add_edge(bonding_spikes, stability)
-        self.graph.add_edge(stability, break_check)
-        self.graph.add_edge(break_check, null_act)
-        self.graph.add_edge(break_check, bond_break)
-        self.graph.add_edge(bond_break, stability)
+        with CoreNode.GraphBuilder(self.graph) as builder:
+            # create envo container and link sample
+            bb_container = CoreContainer.ListEnvironment(self.graph)
+            link_sample = CoreContainer.LinkSample(self.graph)
+
+            # create nodes
+            spikes_check = SpikeDecision(self.graph, link_sample)
+            bonding_spikes = WatsonSpikeBond(self.graph, link_sample, link_sample)
+            stability = SpikeStabilityObservation(self.graph, bb_container, bb_container, link_sample)
+            break_check = SpikeDecision(self.graph, bb_container)
+            bond_break = SpikeBondBreak(self.graph, link_sample, link_sample, bb_container)
+
+            # add dummy action node which does nothing to act as join for decisions
+            null_sample = CoreNode.Sample(self.graph)
+            null_act = CoreNode.Action(self.graph, null_sample, null_sample)
+
+            # link up subgraph nodes
+            builder.add_edges([(spikes_check, bonding_spikes), (spikes_check, null_act), (bonding_spikes, stability),
+                               (stability, break_check), (break_check, null_act), (break_check, bond_break),
+                               (bond_break, stability)])
 
         # set subgraph values
         self.links = [link_sample]
@@ -58,6 +55,7 @@ class SpikeDecision(CoreNode.Decision):
 
 
 class WatsonSpikeBond(CoreNode.Action):
+    firing_probability = 1.0
 
     def __init__(self, graph, readsample, writesample):
         super(WatsonSpikeBond, self).__init__(graph, readsample, writesample)
@@ -108,6 +106,7 @@ class WatsonSpikeBond(CoreNode.Action):
 
 
 class SpikeStabilityObservation(CoreNode.Observer):
+    firing_probability = 1.0
 
     def __init__(self, graph, containersin, containersout, readcontainers):
         super(SpikeStabilityObservation, self).__init__(graph, containersin, containersout, readcontainers)
@@ -124,15 +123,18 @@ class SpikeStabilityObservation(CoreNode.Observer):
         return super(SpikeStabilityObservation, self).check()
 
     def process(self):
+        BatchRBNEngine(self.particles).calculateIntensitySpikes()
         for part in self.particles:
-            if part.checkSpikes():
-                self.broken_bonds.append((part, part.checkSpikes()))
+            broken_bond = part.findBrokenBond()
+            if broken_bond:
+                self.broken_bonds.append((part, broken_bond))
 
     def push(self):
         self.containersout.add(self.broken_bonds)
 
 
 class SpikeBondBreak(CoreNode.Action):
+    firing_probability = 1.0
 
     def __init__(self, graph, readsample, writesample, readcontainers):
         super(SpikeBondBreak, self).__init__(graph, readsample, writesample, readcontainers)
@@ -1 +1 @@
-from metachem.RBNworld.RBNParticle import Node, WatsonSpike, RBN, RBNParticle, WatsonRBNParticleFactory
\ No newline at end of file
+from metachem.RBNworld.RBNParticle import Node, WatsonSpike, RBN, RBNParticle, WatsonRBNParticleFactory, BatchRBNEngine
\ No newline at end of file
@@ -6,8 +6,25 @@ links added separately. This will require the additional processing of the infor
 Graph object.
 
 """
+from collections import deque
+import os
+import pickle
+import random
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
 from metachem import CoreNode
 
+CHECKPOINT_VERSION = 1
+
+# Node kinds used in the compiled control plan.
+TERMINATION = 0
+DECISION = 1
+CONTROL = 2
+
 
 class Simulate(object):
     """
@@ -21,45 +38,95 @@ class Simulate(object):
         graph input.
     verbose : Boolean
         Controls console output for debugging
+    profile : Boolean
+        Runs run_graph with an instrumented loop which records time spent in each stage of every control node, see
+        profile_table. The normal loop is used when False so there is no profiling overhead.
+    checkpoint_path : String
+        File written by automatic checkpoints.
+    checkpoint_every : int
+        If set, a checkpoint is written to checkpoint_path every checkpoint_every transitions, by run_graph (including
+        verbose and profiled runs) and run_fast alike.
+    seed : int
+        If set, every control node is given its own random stream derived from the seed, see seed_streams. Runs with
+        the same seed over graphs built in the same way are then reproducible regardless of other uses of random.
 
     """
 
-    def __init__(self, graph, start_node, verbose=False):
+    def __init__(self, graph, start_node, verbose=False, profile=False, checkpoint_path=None, checkpoint_every=0,
+                 seed=None):
         self.graph = graph
         self.start_node = start_node
         self.graph_index = self.index_graph()
         self.verbose = verbose
+        self.profile = profile
+        self.profile_stats = []
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        if checkpoint_every and not checkpoint_path:
+            raise ValueError("Automatic checkpoints require a checkpoint path")
+        self.dead_ends = []
+        self.unreachable = []
         self.check_graph()
+        self.plan_nodes = []
+        self.plan_successors = []
+        self.plan_kinds = []
+        self.plan_steps = []
+        self.compile_graph()
+        if seed is not None:
+            self.seed_streams(seed)
+        # run state kept between calls of run_fast
+        self.position = 0
+        self.transitions = 0
+        self.terminated = False
+        self.resumed = False
+        self.reset()
 
     def check_graph(self):
         """
-        Function to check the input graph meets the specification of a MetaChem graph.
+        Function to check the input graph meets the specification of a MetaChem graph. The control graph is explored
+        breadth first from the start node, visiting each node once, and all problems are collected in the same pass.
+        Control nodes which can not be reached from the start node are stored in unreachable and reported with a
+        warning. Reachable control nodes, other than Termination nodes, with no outgoing control edge are stored in
+        dead_ends.
+
+        Returns
+        -------
+        bool
+            True if no dead ends were found.
 
         Raises
         -------
-        ValueError("Terminating control nodes must be Termination nodes")
-            If the graph is incorrect a value error is raised to inform the user that the control graph is invalid
-        """
-        checked = []
-        wait_list = []
-        current = self.start_node
-        while current not in checked:
-            checked.append(current)
-            check = self.graph.has_node(current)
-            neighbour_list = list(self.graph.neighbors(current))
-            neighbour_list = [x for x in neighbour_list if isinstance(x, CoreNode.ControlNode)]
+        Warning("May terminate incorrectly or have no termination node")
+            Raised if any dead ends are found, the message lists every dead end.
+        """
+        reached = {self.start_node}
+        wait_list = deque([self.start_node])
+        dead_ends = []
+        while wait_list:
+            current = wait_list.popleft()
+            neighbour_list = [x for x in self.graph.neighbors(current) if isinstance(x, CoreNode.ControlNode)]
             if not neighbour_list and not isinstance(current, CoreNode.Termination):
-                raise Warning("May terminate incorrectly or have no termination node")
-            wait_list = wait_list + neighbour_list
-            wait_list = [x for x in wait_list if x not in checked]
-            if wait_list:
-                current = wait_list[0]
+                dead_ends.append(current)
+            for neighbour in neighbour_list:
+                if neighbour not in reached:
+                    reached.add(neighbour)
+                    wait_list.append(neighbour)
+        self.dead_ends = dead_ends
+        self.unreachable = [x for x in self.graph.nodes if isinstance(x, CoreNode.ControlNode) and x not in reached]
+        if self.unreachable:
+            warnings.warn("Control nodes can not be reached from the start node: " +
+                          ", ".join(describe_node(x) for x in self.unreachable))
+        if dead_ends:
+            raise Warning("May terminate incorrectly or have no termination node, dead ends at: " +
+                          ", ".join(describe_node(x) for x in dead_ends))
         return True
 
     def run_graph(self, transition_limit=0):
         """
         Manages the running of the graph starting at the given pointer and stopping at a termination node or after the
-        processing of ControlNodes equal to the transition_limit.
+        processing of ControlNodes equal to the transition_limit. The run starts from the start node, or from the
+        restored position if resume has been called since the last run. If checkpoint_every is set a checkpoint is
+        written every checkpoint_every transitions.
 
         Parameters
         ----------
@@ -72,30 +139,375 @@ class Simulate(object):
         ValueError: "Pointer must be a control node"
             Raised if pointer is a container node rather than a control node
         """
+        if self.profile:
+            return self.run_profiled(transition_limit)
         if self.start_node and not isinstance(self.start_node, CoreNode.ControlNode):
             raise ValueError("Start must be a control node")
         elif not isinstance(self.start_node, CoreNode.Termination):
             # input tank passed as variable to sload functions
+            nodes = self.plan_nodes
+            successors = self.plan_successors
+            kinds = self.plan_kinds
+            every = self.checkpoint_every
             transitions = 0
-            pointer = self.start_node
+            pointer = self.start_position()
             while transitions <= transition_limit:
-                if isinstance(pointer, CoreNode.Termination):
+                kind = kinds[pointer]
+                if kind == TERMINATION:
                     break
-                elif isinstance(pointer, CoreNode.Decision):
+                elif kind == DECISION:
                     # Different transfer protocol
-                    # Find possible transitions then use transfer to get choice between them
-                    options = [x for x in list(self.graph.neighbors(pointer)) if isinstance(x, CoreNode.ControlNode)]
-                    choice = pointer.transition()
-                    print([choice, options, type(pointer)]) if self.verbose else None
-                    pointer = options[choice]  # Set new pointer
-                elif isinstance(pointer, CoreNode.ControlNode):
+                    # Use transfer to get choice between the precompiled successors
+                    choice = nodes[pointer].transition()
+                    print([choice, [nodes[x] for x in successors[pointer]], type(nodes[pointer])]) \
+                        if self.verbose else None
+                    pointer = successors[pointer][choice]  # Set new pointer
+                else:
                     # Transfer
-                    pointer.transition()
-                    pointer = [x for x in list(self.graph.neighbors(pointer)) if isinstance(x, CoreNode.ControlNode)][0]  # Find next pointer in graph and reset pointer
+                    nodes[pointer].transition()
+                    pointer = successors[pointer][0]  # Find next pointer in plan and reset pointer
                 if transition_limit:
                     transitions = transitions+1
+                self.transitions = self.transitions + 1
+                if every and not self.transitions % every and kinds[pointer] != TERMINATION:
+                    self.position = pointer
+                    self.checkpoint(self.checkpoint_path)
             # processes over the graph by running the nodes starting from the pointer with the preload files passed in
+            self.position = pointer
+            self.terminated = kinds[pointer] == TERMINATION
+
+    def run_profiled(self, transition_limit=0):
+        """
+        Instrumented version of run_graph, used in its place when profile is set. Each control node is run stage by
+        stage so the time spent in read, check, pull, process and push can be recorded along with the number of calls
+        and the number of times check gated the node off. Results replace profile_stats, see profile_table. Resuming
+        and checkpoints work as in run_graph.
+
+        Parameters
+        ----------
+        transition_limit: int
+            The number of node transitions for the system to perform before exiting, as in run_graph.
+        """
+        if self.start_node and not isinstance(self.start_node, CoreNode.ControlNode):
+            raise ValueError("Start must be a control node")
+        nodes = self.plan_nodes
+        successors = self.plan_successors
+        kinds = self.plan_kinds
+        clock = time.perf_counter
+        self.profile_stats = [{"node": describe_node(node), "calls": 0, "read": 0.0, "check": 0.0, "pull": 0.0,
+                               "process": 0.0, "push": 0.0, "gated": 0} for node in nodes]
+        every = self.checkpoint_every
+        transitions = 0
+        pointer = self.start_position()
+        while transitions <= transition_limit:
+            kind = kinds[pointer]
+            if kind == TERMINATION:
+                break
+            node = nodes[pointer]
+            stats = self.profile_stats[pointer]
+            stats["calls"] += 1
+            if kind == DECISION:
+                start = clock()
+                node.read()
+                read = clock()
+                choice = node.process()
+                stats["read"] += read - start
+                stats["process"] += clock() - read
+                print([choice, [nodes[x] for x in successors[pointer]], type(node)]) if self.verbose else None
+                pointer = successors[pointer][choice]
+            else:
+                start = clock()
+                node.read()
+                read = clock()
+                fire = node.fires()
+                check = clock()
+                stats["read"] += read - start
+                stats["check"] += check - read
+                if fire:
+                    node.pull()
+                    pull = clock()
+                    node.process()
+                    process = clock()
+                    node.push()
+                    stats["pull"] += pull - check
+                    stats["process"] += process - pull
+                    stats["push"] += clock() - process
+                else:
+                    stats["gated"] += 1
+                pointer = successors[pointer][0]
+            if transition_limit:
+                transitions = transitions+1
+            self.transitions = self.transitions + 1
+            if every and not self.transitions % every and kinds[pointer] != TERMINATION:
+                self.position = pointer
+                self.checkpoint(self.checkpoint_path)
+        self.position = pointer
+        self.terminated = kinds[pointer] == TERMINATION
+
+    def start_position(self):
+        """
+        Position run_graph and run_profiled start from, the restored position straight after resume and otherwise the
+        start node with the transition count cleared.
+        """
+        if self.resumed:
+            self.resumed = False
+            return self.position
+        self.transitions = 0
+        return 0
+
+    def profile_table(self):
+        """
+        Returns the results of the last profiled run as a table with one row per control node, in plan order.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Columns node, calls, read, check, pull, process, push (cumulative seconds), gated (number of calls where
+            check stopped the node firing) and total (seconds across all stages).
+        """
+        table = pd.DataFrame(self.profile_stats, columns=["node", "calls", "read", "check", "pull", "process", "push",
+                                                          "gated"])
+        table["total"] = table[["read", "check", "pull", "process", "push"]].sum(axis=1)
+        return table
+
+    def run_fast(self, transitions=0, chunk_size=100000):
+        """
+        Runs the graph from the current position without any per transition bookkeeping. Transitions are executed in
+        tight chunks of at most chunk_size, the limit is only checked between chunks and no verbose output is produced.
+        The position and transition count are kept on the Simulate object so run_fast can be called repeatedly to
+        continue the same run, including after resume. Unlike run_graph, exactly the requested number of transitions
+        is executed unless a Termination node is reached first. If checkpoint_every is set chunks are cut at
+        checkpoint boundaries and a checkpoint is written after each one.
+
+        Parameters
+        ----------
+        transitions: int
+            The number of transitions to execute in this call. 0 runs until a Termination node is reached.
+        chunk_size: int
+            The maximum number of transitions executed by the inner loop before control returns to run_fast.
+
+        Returns
+        -------
+        dict
+            "transitions": the number of transitions executed by this call, "terminated": whether the run has reached
+            a Termination node.
+
+        Raises
+        ------
+        ValueError: "Start must be a control node"
+            Raised if the start node is a container node rather than a control node
+        """
+        if self.start_node and not isinstance(self.start_node, CoreNode.ControlNode):
+            raise ValueError("Start must be a control node")
+        executed = 0
+        while not self.terminated and (not transitions or executed < transitions):
+            if transitions:
+                chunk = min(chunk_size, transitions - executed)
+            else:
+                chunk = chunk_size
+            if self.checkpoint_every:
+                chunk = min(chunk, self.checkpoint_every - self.transitions % self.checkpoint_every)
+            executed = executed + self.run_chunk(chunk)
+            if self.checkpoint_every and not self.terminated and not self.transitions % self.checkpoint_every:
+                self.checkpoint(self.checkpoint_path)
+        return {"transitions": executed, "terminated": self.terminated}
+
+    def run_chunk(self, transitions):
+        """
+        Executes up to the given number of transitions from the current position using the compiled plan. Used by
+        run_fast, the loop only dispatches on the precompiled node kind.
+
+        Parameters
+        ----------
+        transitions: int
+            The maximum number of transitions to execute.
+
+        Returns
+        -------
+        int
+            The number of transitions executed, fewer than requested if a Termination node was reached.
+        """
+        steps = self.plan_steps
+        successors = self.plan_successors
+        kinds = self.plan_kinds
+        pointer = self.position
+        for step in range(transitions):
+            kind = kinds[pointer]
+            if kind == CONTROL:
+                steps[pointer]()
+                pointer = successors[pointer][0]
+            elif kind == DECISION:
+                pointer = successors[pointer][steps[pointer]()]
+            else:
+                self.position = pointer
+                self.transitions = self.transitions + step
+                self.terminated = True
+                return step
+        self.position = pointer
+        self.transitions = self.transitions + transitions
+        if kinds[pointer] == TERMINATION:
+            self.terminated = True
+        return transitions
+
+    def seed_streams(self, seed):
+        """
+        Gives every control node in the graph an independent random.Random stream spawned from a single seed. Streams
+        are handed out in graph order so the same seed gives the same stream to the same node whenever the graph is
+        built in the same way, and the draws of one node do not depend on how often any other node draws.
+
+        Parameters
+        ----------
+        seed: int
+            Root seed the per node streams are spawned from.
+        """
+        controls = [node for node in self.graph_index if isinstance(node, CoreNode.ControlNode)]
+        for node, child in zip(controls, np.random.SeedSequence(seed).spawn(len(controls))):
+            node.rng = random.Random(int.from_bytes(child.generate_state(4).tobytes(), "little"))
+            node.uniforms = []
+
+    def reset(self):
+        """
+        Moves the position back to the start node and clears the transition count so the next run_fast call starts a
+        new run. Container contents are not changed.
+        """
+        self.position = 0
+        self.transitions = 0
+        self.terminated = self.plan_kinds[0] == TERMINATION
+
+    def checkpoint(self, path):
+        """
+        Writes the state of the run to a file so it can be continued with resume. The file holds the position in the
+        compiled plan, the transition count, the states of random, numpy.random, any per node streams and buffered
+        uniforms and the contents of every container. Other attributes of control nodes are not saved, so nodes which
+        keep state of their own between transitions, rather than in containers, restart with their state as built. Each
+        container is pickled straight to the file in turn so no second copy of the data is built in memory, and the file
+        is written under a temporary name and moved into place once complete so an interrupted checkpoint never replaces
+        a good one.
+
+        Parameters
+        ----------
+        path: String
+            File the checkpoint is written to.
+        """
+        containers = [(index, node) for index, node in enumerate(self.graph_index)
+                      if isinstance(node, CoreNode.ContainerNode)]
+        streams = [(index, node.rng.getstate()) for index, node in enumerate(self.graph_index)
+                   if isinstance(node, CoreNode.ControlNode) and node.rng is not random]
+        uniforms = [(index, node.uniforms) for index, node in enumerate(self.graph_index)
+                    if isinstance(node, CoreNode.ControlNode) and node.uniforms]
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            pickler = pickle.Pickler(file, pickle.HIGHEST_PROTOCOL)
+            pickler.dump({"version": CHECKPOINT_VERSION, "position": self.position, "transitions": self.transitions,
+                          "terminated": self.terminated, "random": random.getstate(),
+                          "numpy": np.random.get_state(), "streams": streams, "uniforms": uniforms,
+                          "containers": len(containers)})
+            for index, container in containers:
+                pickler.dump((index, type(container).__name__, container_state(container)))
+        os.replace(temp_path, path)
+
+    def resume(self, path):
+        """
+        Restores a run written by checkpoint. The Simulate object must have been built over a graph constructed in the
+        same way as the one that was checkpointed, containers are matched by their position in the graph. Each
+        restored container's restore method is then called, so containers with state on disk can discard what was
+        written after the checkpoint. After resuming, run_fast or the next run_graph continues the run from the
+        checkpointed position.
+
+        Parameters
+        ----------
+        path: String
+            File the checkpoint was written to.
+
+        Raises
+        ------
+        ValueError: "Checkpoint does not match graph"
+            Raised if a container in the checkpoint can not be matched to a container of the same type in the graph.
+        """
+        with open(path, "rb") as file:
+            unpickler = pickle.Unpickler(file)
+            header = unpickler.load()
+            if header["version"] != CHECKPOINT_VERSION:
+                raise ValueError("Unsupported checkpoint version")
+            for _ in range(header["containers"]):
+                index, name, state = unpickler.load()
+                if index >= len(self.graph_index) or type(self.graph_index[index]).__name__ != name:
+                    raise ValueError("Checkpoint does not match graph")
+                vars(self.graph_index[index]).update(state)
+                self.graph_index[index].restore()
+        for index, state in header["streams"]:
+            if index >= len(self.graph_index) or not isinstance(self.graph_index[index], CoreNode.ControlNode):
+                raise ValueError("Checkpoint does not match graph")
+            self.graph_index[index].rng = random.Random()
+            self.graph_index[index].rng.setstate(state)
+        for index, buffered in header["uniforms"]:
+            if index >= len(self.graph_index) or not isinstance(self.graph_index[index], CoreNode.ControlNode):
+                raise ValueError("Checkpoint does not match graph")
+            self.graph_index[index].uniforms = buffered
+        random.setstate(header["random"])
+        np.random.set_state(header["numpy"])
+        self.position = header["position"]
+        self.transitions = header["transitions"]
+        self.terminated = header["terminated"]
+        self.resumed = True
+
+    def compile_graph(self):
+        """
+        Freezes the control graph reachable from the start node into a flat plan. Control nodes are numbered in the
+        order they are found, starting with the start node at index 0, and for each index the plan stores the node,
+        the indices of its control successors (in graph order, so Decision options are preserved) and its kind. The
+        run loop only uses this plan, so the graph must be recompiled if control edges are changed after the
+        Simulate object has been created.
+
+        Returns
+        -------
+        list<tuple<int>>
+            The successor table, node index to successor indices.
+        """
+        index = {self.start_node: 0}
+        nodes = [self.start_node]
+        successors = []
+        kinds = []
+        current = 0
+        while current < len(nodes):
+            node = nodes[current]
+            node_successors = []
+            for neighbour in self.graph.neighbors(node):
+                if isinstance(neighbour, CoreNode.ControlNode):
+                    if neighbour not in index:
+                        index[neighbour] = len(nodes)
+                        nodes.append(neighbour)
+                    node_successors.append(index[neighbour])
+            successors.append(tuple(node_successors))
+            if isinstance(node, CoreNode.Termination):
+                kinds.append(TERMINATION)
+            elif isinstance(node, CoreNode.Decision):
+                kinds.append(DECISION)
+            else:
+                kinds.append(CONTROL)
+            current = current + 1
+        self.plan_nodes = nodes
+        self.plan_successors = successors
+        self.plan_kinds = kinds
+        self.plan_steps = [node.transition for node in nodes]
+        return successors
 
     def index_graph(self):
         return list(self.graph.nodes())
 
+
+def describe_node(node):
+    """
+    Short description of a node used in validation messages.
+    """
+    return type(node).__name__ + "(" + str(node.id) + ")"
+
+
+def container_state(container):
+    """
+    Contents of a container as stored in a checkpoint. The graph, the node id and links to other containers are part
+    of the graph structure rather than the contents and are left out.
+    """
+    return {key: value for key, value in vars(container).items()
+            if key not in ("graph", "id") and not isinstance(value, CoreNode.ContainerNode)}
+
@@ -7,12 +7,10 @@ graph = nx.DiGraph()
 
 # containers
 TTanks = CoreContainer.NestedGridTank(graph)
-Vtime = CoreContainer.ListEnvironment(graph)
-Vtime.add(0)
+Vtime = CoreContainer.CounterEnvironment(graph, 0)
 TTank = stringcat_nodes.StringCatTank(graph)
 Scomposite = CoreContainer.ListSample(graph)
-Vreactions = CoreContainer.ListEnvironment(graph)
-Vreactions.add(0)
+Vreactions = CoreContainer.CounterEnvironment(graph, 0)
 TLoad = CoreContainer.NestedGridTank(graph)  # Empty tank used as place holder as no input tank needed
 
 # control nodes.rst
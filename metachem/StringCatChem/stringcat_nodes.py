@@ -1,5 +1,4 @@
 import string
-import random
 from metachem import CoreControl, CoreContainer, CoreNode
 
 
@@ -56,8 +55,8 @@ class StringCatLoadSampler(CoreNode.Sampler):
         *tanks*.
 
         """
-        self.sample = [[random.choice(string.ascii_uppercase) for _ in range(0, self.size)] for _ in range(0,
-                                                                                                           self.tanks)]
+        self.sample = [[self.rng.choice(string.ascii_uppercase) for _ in range(0, self.size)] for _ in range(0,
+                                                                                                             self.tanks)]
 
     def pull(self):
         self.containersin.remove(self.sample, full=True)
@@ -84,7 +83,7 @@ class StringCatDecompDecision(CoreNode.Decision):
 
     def read(self):
         if self.readcontainers:
-            self.samplestring = self.readcontainers.read()[0]
+            self.samplestring = self.readcontainers.peek(0)
 
     def process(self):
         doubleindex = [i for i in range(0, len(self.samplestring) - 1)
@@ -96,6 +95,7 @@ class StringCatDecompDecision(CoreNode.Decision):
 
 
 class StringCatConcatAction(CoreNode.Action):
+    firing_probability = 1.0
 
     def __init__(self, graph, writesample, readsample, readcontainers=None):
         super(StringCatConcatAction, self).__init__(graph, writesample, readsample, readcontainers)
@@ -125,13 +125,14 @@ class StringCatConcatAction(CoreNode.Action):
 
 
 class StingCatSplitAction(CoreNode.Action):
+    firing_probability = 1.0
 
     def __init__(self, graph, writesample, readsample, readcontainers=None):
         super(StingCatSplitAction, self).__init__(graph, writesample, readsample, readcontainers)
         self.sample = None
 
     def read(self):
-        self.sample = self.readsample.read()[0]
+        self.sample = self.readsample.peek(0)
 
     def pull(self):
         self.readsample.remove(self.sample)
@@ -141,7 +142,7 @@ class StingCatSplitAction(CoreNode.Action):
 
     def process(self):
         doubleindex = [i for i in range(0, len(self.sample) - 1) if self.sample[i] == self.sample[i + 1]]
-        index = random.choice(doubleindex)
+        index = self.rng.choice(doubleindex)
         self.sample = [self.sample[0:index + 1], self.sample[index + 1:]]
         pass
 
@@ -176,18 +177,18 @@ class StringCatTransfersSampler(CoreNode.Sampler):
             if not neighbours:
                 indices.remove(cell)
                 continue
-            othercell = random.choice(neighbours)
+            othercell = self.rng.choice(neighbours)
             indices.remove(othercell)
             indices.remove(cell)
             pairs.append([cell, othercell])
         for pair in pairs:
             try:
-                sample0 = random.sample(sample[pair[1]], self.samplesize)
+                sample0 = self.rng.sample(sample[pair[1]], self.samplesize)
             except ValueError:
                 sample0 = sample[pair[1]]
             self.containersin.remove(sample0, tank=pair[1])
             try:
-                sample1 = random.sample(sample[pair[0]], self.samplesize)
+                sample1 = self.rng.sample(sample[pair[0]], self.samplesize)
             except ValueError:
                 sample1 = sample[pair[0]]
             self.containersin.remove(sample1, tank=pair[0])
@@ -4,5 +4,7 @@ from metachem import SwarmChemistry
 from metachem.Template import Template
 from metachem.Subgraph import Subgraph
 from metachem.Simulate import Simulate
+from metachem.Ensemble import Ensemble
+from metachem.CoreNode import GraphBuilder
 from metachem.ParticleFactory import ParticleFactory
-from metachem.Particle import Particle
\ No newline at end of file
+from metachem.Particle import Particle, CompactParticle, ParticleArray
\ No newline at end of file
@@ -3,6 +3,8 @@ import random
 import string
 
 import networkx as nx
+import numpy as np
+import pandas as pd
 
 from metachem import Template, CoreNode, CoreContainer, CoreControl, Simulate, ParticleFactory, Particle
 from metachem.StringCatChem import SCCBond
@@ -12,7 +14,7 @@ from metachem.RBNworld import WatsonRBNParticleFactory
 class WellMixedTank(Template):
 
     def __init__(self, bondgraph, sample_size=2, reactions=100, generations=10000, tank_size=1000, load_type=None,
-                 log_node=None, load_file=None):
+                 log_node=None, load_file=None, reaction_log=None, reaction_log_mode="new"):
         """
         Simulates a well mixed tank approach to an artificial chemistry. It generates a single tank of particles. In
         each generation it attempts the number of reactions requested by sampling the correct number of particles and
@@ -39,6 +41,12 @@ class WellMixedTank(Template):
             A node used to log information from the simulation
         load_file   :   String
             The file path for csv file if reading in initial tank.
+        reaction_log    :   String
+            If given, reaction attempts are streamed to a DiskLogEnvironment in this directory, recording only the ids
+            of the particles involved, instead of being kept in memory with the particles themselves. The log is
+            closed when the run terminates, runs stopped early should call reactions.close().
+        reaction_log_mode   :   String
+            How existing chunks in the reaction_log directory are treated, see DiskLogEnvironment.
         """
         super(WellMixedTank, self).__init__(bondgraph)
         # check bondgraph meets requirements for well mixed tank
@@ -50,15 +58,18 @@ class WellMixedTank(Template):
         # generate graph with bondgraph connected
 
         # set up containers
-        TTank = CoreContainer.ListTank(self.graph)
+        TTank = CoreContainer.ListTank(self.graph, indexed=True)
         self.tank = TTank
         TNew = CoreContainer.ListTank(self.graph)
-        VTime = CoreContainer.StackEnvironment(self.graph)
-        VTime.add(0)
-        VGen = CoreContainer.StackEnvironment(self.graph)
-        VGen.add(0)
+        VTime = CoreContainer.CounterEnvironment(self.graph, 0)
+        VGen = CoreContainer.CounterEnvironment(self.graph, 0)
         VBond = CoreContainer.DictionaryEnvironment(self.graph)
-        VReaction = CoreContainer.DataFrameEnvironment(self.graph, ["id1", "id2", "obj1", "obj2", "Prods"])
+        if reaction_log:
+            VReaction = CoreContainer.DiskLogEnvironment(self.graph, reaction_log, ["id1", "id2", "Prods"],
+                                                         mode=reaction_log_mode)
+        else:
+            VReaction = CoreContainer.DataFrameEnvironment(self.graph, ["id1", "id2", "obj1", "obj2", "Prods"],
+                                                           buffer_size=10000)
         self.reactions = VReaction
         # connect SComposite to link containers
         SComposite = CoreContainer.ListSample(self.graph)
@@ -82,7 +93,7 @@ class WellMixedTank(Template):
         ogen = CoreControl.ClockObserver(self.graph, VGen, VGen)
         dgen = TimingsDecision(self.graph, [VGen, VTime, TTank], generations, reactions, sample_size)
         osample = SampleObserver(self.graph, VBond, VBond, SComposite)
-        oreturn = ReturnObserver(self.graph, VBond, VReaction, SComposite)
+        oreturn = ReturnObserver(self.graph, VBond, VReaction, SComposite, ids_only=bool(reaction_log))
         # if log_node given include
         if log_node:
             olog = log_node
@@ -93,7 +104,12 @@ class WellMixedTank(Template):
         # Creat stable graph edges
         edges = [[sload, otime], [otime, oreset], [oreset, ssample], [ssample, osample], [oreturn, sreturn],
                  [sreturn, ogen], [ogen, dgen], [dgen, ssample], [dgen, sgeneration], [sgeneration, olog],
-                 [olog, otime], [dgen, ssimulation], [ssimulation, tterm]]
+                 [olog, otime], [dgen, ssimulation]]
+        if reaction_log:
+            oclose = CloseLogObserver(self.graph, VReaction, VReaction)
+            edges = edges + [[ssimulation, oclose], [oclose, tterm]]
+        else:
+            edges = edges + [[ssimulation, tterm]]
 
         # add edges to graph
         for edge in edges:
@@ -119,7 +135,8 @@ class WellMixedTank(Template):
             print(self.tank.read())
 
     def print_reactions(self):
-        print(self.reactions.read())
+        reactions = self.reactions.read()
+        print(reactions if isinstance(reactions, pd.DataFrame) else reactions[:])
 
 
 class LoadSampler(CoreNode.Sampler):
@@ -170,11 +187,13 @@ class LoadSampler(CoreNode.Sampler):
         """
         # gen values if not read
         if self.load_type == "scc":
-            self.sample = [random.choice(string.ascii_uppercase) for _ in range(0, self.tank_size)]
+            self.sample = [self.rng.choice(string.ascii_uppercase) for _ in range(0, self.tank_size)]
         elif self.load_type == "int":
-            self.sample = [random.randint(0, 100) for _ in range(0, self.tank_size)]
+            self.sample = [self.rng.randint(0, 100) for _ in range(0, self.tank_size)]
         elif self.load_type == "RBN":
-            factory = WatsonRBNParticleFactory(8, 2)
+            # Without a seeded stream of its own the node keeps building RBNs from the global numpy state
+            rng = np.random.RandomState(self.rng.getrandbits(32)) if self.rng is not random else None
+            factory = WatsonRBNParticleFactory(8, 2, rng=rng)
             self.sample = factory.createParticles(self.tank_size)
         elif isinstance(self.load_type, ParticleFactory):
             self.sample = self.load_type.createParticles(self.tank_size)
@@ -215,15 +234,21 @@ class TimingsDecision(CoreNode.Decision):
         self.time = 0
         self.gen = 0
         self.tank_size = 0
+        self.counters = all(isinstance(container, CoreContainer.CounterEnvironment)
+                            for container in readcontainers[0:2])
 
     def read(self):
         """
         Reads in the current times and bond count.
 
         """
-        self.gen = self.readcontainers[0].read()[0]
-        self.time = self.readcontainers[1].read()[0]
-        self.tank_size = len(self.readcontainers[2].read())
+        if self.counters:
+            self.gen = self.readcontainers[0].get()
+            self.time = self.readcontainers[1].get()
+        else:
+            self.gen = self.readcontainers[0].peek(0)
+            self.time = self.readcontainers[1].peek(0)
+        self.tank_size = len(self.readcontainers[2])
 
     def process(self):
         """
@@ -267,8 +292,8 @@ class TimeLoggerObserver(CoreNode.Observer):
         Reads in value of clock and reactions.
 
         """
-        self.clock = self.clock_container.read()[0]
-        self.reactions = self.reactions_container.read()[0]
+        self.clock = self.clock_container.peek(0)
+        self.reactions = self.reactions_container.peek(0)
         pass
 
     def pull(self):
@@ -296,7 +321,7 @@ class SampleObserver(CoreNode.Observer):
         self.dict = None
 
     def read(self):
-        self.sample = self.readcontainers.read()
+        self.sample = self.readcontainers.view()
 
     def pull(self):
         self.containersout.remove(["id1", "id2", "obj1", "obj2"])
@@ -325,21 +350,32 @@ class SampleObserver(CoreNode.Observer):
 class ReturnObserver(CoreNode.Observer):
     """
     Records the result of the bonding attempt and pushes to a log of all reaction attempts.
+
+    Parameters
+    ----------
+    ids_only    :   Boolean
+        Log only the ids of particles, as columns id1, id2 and Prods, so the log does not keep particles alive.
+        Samples which are not Particles are logged as they are.
     """
 
-    def __init__(self, graph, containersin, containersout, readcontainers=None):
+    def __init__(self, graph, containersin, containersout, readcontainers=None, ids_only=False):
         super(ReturnObserver, self).__init__(graph, containersin, containersout, readcontainers)
         self.sample = None
         self.dict = None
+        self.ids_only = ids_only
 
     def read(self):
-        self.sample = self.readcontainers.read()
+        self.sample = self.readcontainers.view()
         self.dict = self.containersin.read()
 
     def pull(self):
         pass
 
     def process(self):
+        if self.ids_only:
+            self.dict = {"id1": identify(self.dict["obj1"]), "id2": identify(self.dict["obj2"]),
+                         "Prods": tuple([identify(part) for part in self.sample])}
+            return
         if isinstance(self.sample[0], Particle):
             prods = tuple([(part.id, part) for part in self.sample])
         else:
@@ -350,6 +386,34 @@ class ReturnObserver(CoreNode.Observer):
         self.containersout.add(self.dict)
 
 
+class CloseLogObserver(CoreNode.Observer):
+    """
+    Closes a log environment on the way to termination so any buffered rows are written.
+    """
+
+    def __init__(self, graph, containersin, containersout, readcontainers=None):
+        super(CloseLogObserver, self).__init__(graph, containersin, containersout, readcontainers)
+
+    def read(self):
+        pass
+
+    def pull(self):
+        pass
+
+    def process(self):
+        pass
+
+    def push(self):
+        self.containersout.close()
+
+
+def identify(particle):
+    """
+    The id of a Particle, other samples are returned unchanged.
+    """
+    return particle.id if isinstance(particle, Particle) else particle
+
+
 if __name__ == "__main__":
     scc_bondgraph = SCCBond()
     reactor = WellMixedTank(scc_bondgraph, load_type="scc")
@@ -47,3 +47,39 @@ class TestClockObserver(TestCase):
         otime.transition()
         self.assertEqual(VTime.read(), [7], "Clock did not push correctly")
 
+
+
+class RecordingTank(CoreContainer.ListTank):
+
+    def __init__(self, graph):
+        super(RecordingTank, self).__init__(graph)
+        self.removed = []
+
+    def remove(self, particles=None):
+        self.removed.append(particles)
+        return super(RecordingTank, self).remove(particles)
+
+
+class TestSimpleSampler(TestCase):
+    def test_single_step(self):
+        graph = nx.DiGraph()
+        TTank = CoreContainer.ListTank(graph, indexed=True)
+        TTank.add(list(range(10)))
+        sample = CoreContainer.ListSample(graph)
+        ssample = CoreControl.SimpleSampler(graph, TTank, sample, size=3)
+        self.assertTrue(ssample.single_step, "Sample not taken with sample_and_remove")
+        ssample.read()
+        ssample.pull()
+        ssample.push()
+        self.assertEqual(7, len(TTank.read()), "Sample not removed from tank")
+        self.assertCountEqual(ssample.sample, sample.read(), "Sample not added to output")
+
+    def test_overridden_remove(self):
+        graph = nx.DiGraph()
+        TTank = RecordingTank(graph)
+        TTank.add(list(range(10)))
+        ssample = CoreControl.SimpleSampler(graph, TTank, CoreContainer.ListSample(graph), size=3)
+        self.assertFalse(ssample.single_step, "Overridden remove bypassed")
+        ssample.read()
+        ssample.pull()
+        self.assertEqual(ssample.sample, TTank.removed, "Sample not removed through container remove")
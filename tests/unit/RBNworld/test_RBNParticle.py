@@ -1,6 +1,7 @@
 from unittest import TestCase
-from metachem.RBNworld import WatsonRBNParticleFactory, RBNParticle
+from metachem.RBNworld import WatsonRBNParticleFactory, RBNParticle, BatchRBNEngine
 import pickle
+import random
 
 
 class TestWatsonRBNParticleFactory(TestCase):
@@ -24,3 +25,41 @@ class TestWatsonRBNParticleFactory(TestCase):
         # # TODO: generate a tank with the same seed
         # particles2 = fact.createParticles(100, 4)
         # self.assertListEqual(particles1, particles2, "Lists with same seed not the same")
+
+    def test_create_particles_seeded(self):
+        def structure(particles):
+            return [(part.id, part.atoms[0].states.tolist(), [spike.intensity for spike in part.atoms[0].spikeArray])
+                    for part in particles]
+        particles1 = WatsonRBNParticleFactory(8, 2).createParticles(20, 4)
+        particles2 = WatsonRBNParticleFactory(8, 2).createParticles(20, 4)
+        self.assertEqual(structure(particles1), structure(particles2), "Particles with same seed not the same")
+        self.assertEqual([(i,) for i in range(20)], [part.id for part in particles1], "Particles not numbered in order")
+
+    def test_create_particles_chunked(self):
+        fact = WatsonRBNParticleFactory(8, 2)
+        serial = fact.createParticles(12, 4, chunk_size=5)
+        self.assertEqual(12, fact.index, "Factory index not advanced past chunks")
+        pooled = WatsonRBNParticleFactory(8, 2).createParticles(12, 4, workers=2, chunk_size=5)
+        self.assertEqual([part.id for part in serial], [part.id for part in pooled], "Chunk ids depend on workers")
+        self.assertEqual([part.atoms[0].states.tolist() for part in serial],
+                         [part.atoms[0].states.tolist() for part in pooled], "Chunk particles depend on workers")
+
+
+class TestBatchRBNEngine(TestCase):
+    def test_calculate_intensity_spikes(self):
+        sequential = WatsonRBNParticleFactory(10, 2, maxSizeAtoms=20).createParticles(10, 5)
+        batched = WatsonRBNParticleFactory(10, 2, maxSizeAtoms=20).createParticles(10, 5)
+        for part in sequential:
+            part.calculateIntensitySpikes(part.atoms)
+        BatchRBNEngine(batched).calculateIntensitySpikes()
+        for part1, part2 in zip(sequential, batched):
+            self.assertEqual([spike.intensity for spike in part1.atoms[0].spikeArray],
+                             [spike.intensity for spike in part2.atoms[0].spikeArray], "Batched intensities differ")
+            self.assertEqual(part1.atoms[0].states.tolist(), part2.atoms[0].states.tolist(), "States not restored")
+
+    def test_chunks_leave_random(self):
+        random.seed(2)
+        expected = random.random()
+        random.seed(2)
+        WatsonRBNParticleFactory(8, 2).createParticles(6, 4, chunk_size=3)
+        self.assertEqual(expected, random.random(), "Chunked creation changed the global random state")
@@ -1,5 +1,7 @@
 from unittest import TestCase
+from numpy import random
 from metachem.RBNworld import RBN, WatsonSpike
+from metachem.RBNworld.RBNParticle import StateHistory, findRepeatedState, cycleIntensity
 import pickle
 
 
@@ -90,3 +92,79 @@ class TestRBN(TestCase):
         self.assertEqual(rbn.numIterations, 0, "Incorrect number of iterations")
         # check state unchanged
         self.assertEqual([0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0], list(rbn.states), "Incorrect state reset")
+
+    def test_update_matches_nodes(self):
+        rbn = RBN(12, 2, 1, rng=random.RandomState(3))
+        for _ in range(5):
+            expected = [node.boolFunc[sum(node.connections[i].state * 2 ** i for i in range(rbn.k))]
+                        for node in rbn.nodeArray]
+            rbn.updateRBN()
+            self.assertListEqual(expected, list(rbn.states[-1]), "Update does not follow node boolean functions")
+            self.assertListEqual(expected, [node.state for node in rbn.nodeArray], "Node states not updated")
+
+    def test_rewire(self):
+        rbn = RBN(12, 2, 1, rng=random.RandomState(3))
+        other = RBN(12, 2, 2, rng=random.RandomState(4))
+        rbn.updateRBN()
+        node = rbn.nodeArray[0]
+        node.changeConnection(node.connections[0], other.nodeArray[5])
+        sources, inputs, table = rbn.compileWiring()
+        self.assertEqual([rbn, other], sources, "Bonded rbn not an input source")
+        self.assertEqual(12 + 5, inputs[0, 0], "Connection to bonded rbn not compiled")
+
+
+class TestStateHistory(TestCase):
+
+    def test_append_pop(self):
+        history = StateHistory(3, capacity=2)
+        history.reset([0, 0, 0])
+        for i in range(4):
+            history.append([i % 2, 1, 0])
+        self.assertEqual((5, 3), history.view().shape, "Rows not appended past capacity")
+        self.assertListEqual([1, 1, 0], list(history.pop()), "Wrong row popped")
+        self.assertListEqual([0, 1, 0], list(history.last()), "Cursor not moved back")
+
+    def test_views_kept(self):
+        rbn = RBN(12, 2, 1, rng=random.RandomState(3))
+        for _ in range(3):
+            rbn.updateRBN()
+        states = rbn.states.copy()
+        view = rbn.states
+        rbn.popState()
+        rbn.appendState(1 - states[-1])
+        rbn.zeroRBN()
+        self.assertListEqual(states.tolist(), view.tolist(), "View changed by later updates")
+
+    def test_pickle(self):
+        rbn = RBN(12, 2, 1, rng=random.RandomState(3))
+        for _ in range(3):
+            rbn.updateRBN()
+        copy = pickle.loads(pickle.dumps(rbn))
+        self.assertListEqual(rbn.states.tolist(), copy.states.tolist(), "States lost by pickle")
+        copy.updateRBN()
+        rbn.updateRBN()
+        self.assertListEqual(rbn.states.tolist(), copy.states.tolist(), "Pickled rbn updates differently")
+
+
+class TestAttractor(TestCase):
+
+    def test_find_attractor(self):
+        rbn = RBN(12, 2, 1, rng=random.RandomState(3))
+        states = rbn.states.copy()
+        start, length, cycle = rbn.findAttractor()
+        self.assertEqual((length, 12), cycle.shape, "Cycle states do not match cycle length")
+        self.assertListEqual(states.tolist(), rbn.states.tolist(), "States not restored")
+        for _ in range(start + length):
+            rbn.updateRBN()
+        self.assertListEqual(list(rbn.states[start]), list(rbn.states[-1]), "State does not repeat after cycle")
+        self.assertEqual(length, rbn.findCycleLength(), "Cycle length differs from attractor")
+
+    def test_find_repeated_state(self):
+        states = [[0, 1], [1, 1], [0, 0], [1, 0], [0, 0], [1, 1]]
+        self.assertEqual((1, 4), findRepeatedState(states), "Earliest repeated row not found")
+        self.assertIsNone(findRepeatedState([[0, 1], [1, 1]]), "Repeat found without one")
+
+    def test_cycle_intensity(self):
+        cycle = [[1, 0, 1, 0], [1, 0, 0, 0]]
+        self.assertEqual(0, cycleIntensity(cycle, [0, 1]), "Fixed on and off nodes not balanced")
+        self.assertEqual(-2, cycleIntensity(cycle, [1, 2, 3, 3]), "Intensity not counted once per node")
@@ -1,7 +1,12 @@
+import pickle
+import random
+import tempfile
 from unittest import TestCase
 import networkx as nx
 import pandas as pd
-from metachem.CoreContainer import DataFrameEnvironment
+from metachem.CoreContainer import CounterEnvironment, DataFrameEnvironment, DiskLogEnvironment, DiskLogReader, \
+    DictionaryEnvironment, DictionaryTank, IndexedList, LinkTank, ListSample, ListTank, QueueTank, StackEnvironment, \
+    StackTank
 
 
 class TestDataFrameEnvironment(TestCase):
@@ -44,3 +49,302 @@ class TestDataFrameEnvironment(TestCase):
         self.assertFalse(data.DataFrame.empty, "The dataframe is still empty")
         self.assertEqual(data.DataFrame.shape[0], 3, "Incorrect number of rows")
 
+
+class TestBufferedDataFrameEnvironment(TestCase):
+
+    def test_buffered_add(self):
+        graph = nx.DiGraph()
+        data = DataFrameEnvironment(graph, ["id1", "id2", "Prods"], buffer_size=3)
+        data.add({"id1": 1, "id2": 2, "Prods": (3, 'AB')})
+        data.add([{"id1": 3, "id2": 1, "Prods": (4, 'ABA')}])
+        self.assertTrue(data.DataFrame.empty, "Rows written before the buffer was full")
+        data.add({"id1": 3, "id2": 2, "Prods": (5, 'ABB')})
+        self.assertEqual(3, data.DataFrame.shape[0], "Full buffer not flushed")
+        data.add({"id1": 5, "id2": 4, "Prods": (6, 'ABBAB')})
+        ret = data.read()
+        self.assertEqual(4, ret.shape[0], "Buffered rows not flushed on read")
+        self.assertEqual([1, 3, 3, 5], list(ret["id1"]), "Rows out of order")
+        self.assertEqual((6, 'ABBAB'), ret["Prods"][3], "Incorrect row contents")
+
+
+class TestKeyedDataFrameEnvironment(TestCase):
+
+    def test_keyed_remove(self):
+        graph = nx.DiGraph()
+        data = DataFrameEnvironment(graph, ["id1", "id2", "obj1"], buffer_size=2, key_columns=["id1", "id2"])
+        data.add([{"id1": 1, "id2": 2, "obj1": 'A'}, {"id1": 3, "id2": 1, "obj1": 'AB'}])
+        data.add({"id1": 3, "id2": 2, "obj1": 'AB'})
+        data.remove({"id1": 3, "id2": 1, "obj1": None})
+        self.assertEqual({1}, data.dead, "Removed row not marked dead")
+        data.remove([{"id1": 3, "id2": 2}])
+        ret = data.read()
+        self.assertEqual([1], list(ret["id1"]), "Incorrect rows removed")
+        self.assertEqual({(1, 2): [0]}, data.key_index, "Index not rebuilt on compaction")
+        data.add({"id1": 4, "id2": 5, "obj1": 'B'})
+        data.remove({"id1": 1, "id2": 2})
+        self.assertEqual([4], list(data.read()["id1"]), "Index out of date after compaction")
+
+    def test_key_columns(self):
+        with self.assertRaises(ValueError):
+            DataFrameEnvironment(nx.DiGraph(), ["id1", "id2"], key_columns=["id3"])
+
+
+class TestDiskLogEnvironment(TestCase):
+
+    def test_log(self):
+        with tempfile.TemporaryDirectory() as directory:
+            graph = nx.DiGraph()
+            log = DiskLogEnvironment(graph, directory, ["id1", "id2", "Prods"], chunk_size=4)
+            log.add([{"id1": i, "id2": i + 1, "Prods": tuple(range(i % 3))} for i in range(10)])
+            self.assertEqual(10, len(log), "Incorrect number of rows logged")
+            reader = log.read()
+            self.assertEqual(3, len(reader.chunks), "Rows not written in chunks")
+            rows = reader[3:9]
+            self.assertEqual(list(range(3, 9)), list(rows["id1"]), "Incorrect slice across chunks")
+            self.assertEqual((0, 1), rows["Prods"][2], "Tuple column not restored")
+            self.assertEqual(10, reader[-1]["id2"], "Incorrect last row")
+            with self.assertRaises(ValueError):
+                log.remove({"id1": 0})
+            with self.assertRaises(ValueError):
+                DiskLogEnvironment(graph, directory, ["id1", "id2", "Prods"])
+            reopened = DiskLogEnvironment(graph, directory, ["id1", "id2", "Prods"], chunk_size=4, mode="append")
+            reopened.add({"id1": 10, "id2": 11, "Prods": ()})
+            self.assertEqual(11, len(reopened.read()), "Reopened log did not append")
+            overwritten = DiskLogEnvironment(graph, directory, ["id1", "id2", "Prods"], mode="overwrite")
+            self.assertEqual(0, len(overwritten.read()), "Overwritten log kept old rows")
+
+    def test_stale_chunks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log = DiskLogEnvironment(nx.DiGraph(), directory, ["id1"], chunk_size=2)
+            log.add([{"id1": i} for i in range(3)])
+            state = {"written": log.written, "buffered": log.buffered, "buffer": {"id1": list(log.buffer["id1"])}}
+            log.add([{"id1": i} for i in range(3, 6)])
+            vars(log).update(state)
+            log.add([{"id1": i} for i in range(3, 5)])
+            with self.assertRaises(ValueError):
+                log.read()
+            log.restore()
+            self.assertEqual([0, 1, 2, 3, 4], list(log.read()[:]["id1"]), "Stale chunks not removed on restore")
+
+    def test_close(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with DiskLogEnvironment(nx.DiGraph(), directory, ["id1", "id2"]) as log:
+                log.add([{"id1": 1, "id2": 2}, {"id1": 3, "id2": "n/a"}])
+            reader = DiskLogReader(directory)
+            self.assertEqual(2, len(reader), "Buffered rows not written on close")
+            self.assertEqual([2, "n/a"], list(reader[:]["id2"]), "Mixed id column not kept as objects")
+            self.assertEqual([1, 3], list(reader[:]["id1"]), "Numeric column changed")
+
+
+class TestKeySampling(TestCase):
+
+    def test_sample_values(self):
+        graph = nx.DiGraph()
+        tank = DictionaryTank(graph)
+        tank.add({i: "p" + str(i) for i in range(10)})
+        rng = random.Random(2)
+        sample = tank.sample_values(3, rng)
+        self.assertEqual(3, len(set(sample)), "Sample not drawn from distinct entries")
+        tank.remove([0, 5])
+        tank.add({10: "p10"})
+        self.assertCountEqual(list(tank.dict.values()), tank.sample_values(20, rng), "Key list out of date")
+        self.assertEqual(len(tank.dict), len(tank.key_positions), "Key positions out of date")
+
+    def test_add_in_place(self):
+        graph = nx.DiGraph()
+        tank = DictionaryTank(graph)
+        storage = tank.dict
+        tank.add({"a": 1})
+        self.assertIs(storage, tank.add({"b": 2}), "Dictionary replaced on add")
+        environment = DictionaryEnvironment(graph)
+        environment.add({"a": 1, "b": 2})
+        environment.remove(["a"])
+        self.assertEqual([2], environment.sample_values(2), "Environment sampling incorrect")
+
+
+class TestView(TestCase):
+
+    def test_list_view(self):
+        graph = nx.DiGraph()
+        tank = ListTank(graph)
+        self.assertEqual(0, len(tank), "Empty tank has length")
+        self.assertTrue(tank, "Empty container is falsy")
+        self.assertEqual([], list(tank), "Empty tank iterates")
+        tank.add(["A", "B", "C"])
+        self.assertIs(tank.list, tank.view(), "View copied the list")
+        self.assertEqual(3, len(tank), "Incorrect length")
+        self.assertEqual("B", tank.peek(1), "Incorrect item peeked")
+        self.assertEqual(["A", "B", "C"], list(tank), "Incorrect iteration")
+
+    def test_dictionary_view(self):
+        graph = nx.DiGraph()
+        tank = DictionaryTank(graph)
+        tank.add({"a": 1})
+        with self.assertRaises(TypeError):
+            tank.view()["b"] = 2
+        tank.add({"b": 2})
+        self.assertEqual(2, len(tank.view()), "View does not follow the dictionary")
+
+    def test_link_view(self):
+        graph = nx.DiGraph()
+        tank = ListTank(graph)
+        tank.add(["A", "B"])
+        link = LinkTank(graph)
+        link.set_linknode(tank)
+        self.assertEqual(2, len(link), "Length not forwarded")
+        self.assertEqual("A", link.peek(0), "Peek not forwarded")
+
+
+class TestListTank(TestCase):
+
+    def test_add_copies(self):
+        graph = nx.DiGraph()
+        tank = ListTank(graph)
+        particles = ["A", "B"]
+        tank.add(particles)
+        tank.add(["C"])
+        self.assertEqual(["A", "B"], particles, "Tank modified the added list")
+        self.assertEqual(["A", "B", "C"], tank.read(), "Incorrect contents after add")
+
+    def test_bulk_remove(self):
+        graph = nx.DiGraph()
+        sample = ListSample(graph)
+        sample.add(["A", "B", "A", "C", "A"])
+        sample.remove(["A", "C", "A"])
+        self.assertEqual(["B", "A"], sample.read(), "Bulk remove differs from repeated list.remove")
+        with self.assertRaises(ValueError):
+            sample.remove(["B", "D"])
+        self.assertEqual(["B", "A"], sample.read(), "Failed remove changed the sample")
+
+    def test_indexed_remove(self):
+        graph = nx.DiGraph()
+        tank = ListTank(graph, indexed=True)
+        particles = [object() for _ in range(50)]
+        tank.add(particles)
+        removed = random.Random(1).sample(particles, 30)
+        tank.remove(removed[:29])
+        tank.remove(removed[29])
+        self.assertIsInstance(tank.list, IndexedList, "Indexed tank not using an IndexedList")
+        self.assertCountEqual([p for p in particles if p not in removed], tank.read(), "Incorrect particles removed")
+        for position, particle in enumerate(tank.list):
+            self.assertIn(position, tank.list.positions[id(particle)], "Position map out of date")
+        with self.assertRaises(ValueError):
+            tank.remove(removed[0])
+
+    def test_indexed_pickle(self):
+        restored = pickle.loads(pickle.dumps(IndexedList(["A", "B", "C"])))
+        restored.remove("B")
+        self.assertCountEqual(["A", "C"], restored, "Position map not rebuilt on load")
+
+
+class TestSampleAndRemove(TestCase):
+
+    def test_swap_sample(self):
+        for indexed in [False, True]:
+            graph = nx.DiGraph()
+            tank = ListTank(graph, indexed=indexed)
+            tank.add(list(range(20)))
+            sample = tank.sample_and_remove(5, random.Random(4))
+            self.assertEqual(5, len(set(sample)), "Incorrect sample size")
+            self.assertCountEqual(set(range(20)) - set(sample), tank.read(), "Sample not removed from tank")
+            self.assertEqual(15, len(tank.sample_and_remove(20, random.Random(4))), "Oversized sample not capped")
+
+    def test_plain_order(self):
+        graph = nx.DiGraph()
+        tank = ListTank(graph)
+        tank.add(list(range(10)))
+        sample = tank.sample_and_remove(3, random.Random(4))
+        self.assertEqual([i for i in range(10) if i not in sample], tank.read(), "Plain tank order not preserved")
+
+    def test_ordered_sample(self):
+        graph = nx.DiGraph()
+        queue = QueueTank(graph)
+        queue.add(list(range(10)))
+        sample = queue.sample_and_remove(3, random.Random(4))
+        self.assertEqual([i for i in range(10) if i not in sample], queue.read(), "Queue order not preserved")
+
+
+class TestMoveAllTo(TestCase):
+
+    def test_swap(self):
+        graph = nx.DiGraph()
+        source = ListSample(graph)
+        target = ListTank(graph)
+        source.add(["A", "B"])
+        storage = source.list
+        source.move_all_to(target)
+        self.assertIs(storage, target.list, "Storage not handed over")
+        self.assertEqual([], source.read(), "Source not emptied")
+
+    def test_extend(self):
+        graph = nx.DiGraph()
+        source = ListTank(graph)
+        target = ListTank(graph, indexed=True)
+        source.add(["A", "B"])
+        source.move_all_to(target)
+        self.assertIsInstance(target.list, IndexedList, "Target storage type changed")
+        target.move_all_to(source)
+        source.add(["C"])
+        target.add(["D"])
+        source.move_all_to(target)
+        self.assertCountEqual(["A", "B", "C", "D"], target.read(), "Incorrect contents after move")
+        stack = StackEnvironment(graph)
+        target.move_all_to(stack)
+        self.assertEqual(4, len(stack), "Move to a stack incorrect")
+        self.assertEqual(0, len(target), "Indexed source not emptied")
+
+
+class TestCounterEnvironment(TestCase):
+
+    def test_counter(self):
+        graph = nx.DiGraph()
+        counter = CounterEnvironment(graph, 0)
+        self.assertEqual(2, counter.incr(2), "Incorrect increment")
+        counter.set(5)
+        self.assertEqual([5], counter.read(), "Value not readable as a list")
+        self.assertEqual(5, counter.peek(0), "Incorrect value peeked")
+        counter.remove(5)
+        self.assertEqual(0, len(counter), "Remove did not clear counter")
+        counter.add([7])
+        self.assertEqual(7, counter.get(), "Add did not replace value")
+
+
+class TestStackQueue(TestCase):
+
+    def test_stack(self):
+        graph = nx.DiGraph()
+        stack = StackEnvironment(graph)
+        stack.add([1, 2])
+        stack.add(0)
+        self.assertEqual([0, 1, 2], stack.read(), "Incorrect stack order")
+        stack.remove([None, None])
+        self.assertEqual([2], stack.read(), "Incorrect variables popped")
+        stack.remove([None, None])
+        self.assertEqual([], stack.read(), "Popping past the bottom not ignored")
+
+    def test_queue(self):
+        graph = nx.DiGraph()
+        queue = QueueTank(graph)
+        queue.add(["A", "B"])
+        queue.add("C")
+        queue.remove(["X"])
+        self.assertEqual(["B", "C"], queue.read(), "Incorrect queue order")
+        self.assertEqual("B", queue.peek(0), "Incorrect front of queue")
+
+    def test_empty_read(self):
+        graph = nx.DiGraph()
+        for tank in [StackTank(graph), QueueTank(graph)]:
+            self.assertEqual([], tank.read(), "New " + type(tank).__name__ + " not read as an empty list")
+            tank.add(["A"])
+            tank.remove(["A"])
+            self.assertEqual([], tank.read(), "Emptied " + type(tank).__name__ + " not read as an empty list")
+
+    def test_capacity(self):
+        graph = nx.DiGraph()
+        clock = StackEnvironment(graph, capacity=1)
+        clock.add(0)
+        clock.add(1)
+        self.assertEqual([1], clock.read(), "Capacity not enforced")
+        queue = QueueTank(graph, capacity=2)
+        queue.add(["A", "B", "C"])
+        self.assertEqual(["B", "C"], queue.read(), "Queue did not drop from the front")
@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+import networkx as nx
+
+from metachem import CoreContainer, CoreControl, CoreNode
+
+
+class TestGraphBuilder(TestCase):
+
+    def test_build(self):
+        graph = nx.DiGraph()
+        with CoreNode.GraphBuilder(graph) as builder:
+            VTime = CoreContainer.CounterEnvironment(graph, 0)
+            otime = CoreControl.ClockObserver(graph, VTime, VTime)
+            dcount = CoreControl.CounterDecision(graph, 2, VTime, 5)
+            tterm = CoreNode.Termination(graph)
+            builder.add_edges([(otime, dcount), (dcount, otime), (dcount, tterm)])
+            self.assertEqual(0, graph.number_of_edges(), "Edges added before the builder exited")
+        self.assertEqual([VTime, otime, tterm], list(graph.neighbors(dcount)), "Edges not added in order")
+        self.assertNotIn(CoreNode.GraphBuilder.KEY, graph.graph, "Builder not removed from graph")
+
+    def test_missing_containers(self):
+        graph = nx.DiGraph()
+        VTime = CoreContainer.CounterEnvironment(nx.DiGraph(), 0)
+        TTank = CoreContainer.ListTank(nx.DiGraph())
+        TNew = CoreContainer.ListTank(graph)
+        with self.assertRaises(ValueError) as context:
+            with CoreNode.GraphBuilder(graph):
+                CoreControl.ClockObserver(graph, VTime, VTime)
+                CoreControl.BruteSampler(graph, TTank, TNew)
+        self.assertIn("CounterEnvironment, ListTank", str(context.exception), "Missing containers not all reported")
+        self.assertFalse(graph.has_node(TTank), "Edges added despite missing containers")
+
+    def test_immediate_check(self):
+        graph = nx.DiGraph()
+        TTank = CoreContainer.ListTank(nx.DiGraph())
+        with self.assertRaises(ValueError):
+            CoreControl.BruteSampler(graph, TTank, CoreContainer.ListTank(graph))
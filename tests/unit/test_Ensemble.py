@@ -0,0 +1,44 @@
+from unittest import TestCase
+import random
+
+import networkx as nx
+
+from metachem import CoreContainer, CoreControl, CoreNode
+from metachem.Ensemble import Ensemble, run_replicate, run_statistics
+
+
+class CountingTemplate(object):
+    """
+    Template which counts a clock up to a random threshold, drawn when the template is built.
+    """
+
+    def __init__(self):
+        self.graph = nx.DiGraph()
+        self.clock = CoreContainer.ListEnvironment(self.graph)
+        self.clock.add(1)
+        otime = CoreControl.ClockObserver(self.graph, self.clock, self.clock)
+        dcount = CoreControl.CounterDecision(self.graph, 2, self.clock, random.randint(2, 50))
+        tterm = CoreNode.Termination(self.graph)
+        for edge in [[otime, dcount], [dcount, otime], [dcount, tterm]]:
+            self.graph.add_edge(edge[0], edge[1])
+        self.start = otime
+
+
+def clock_summary(template, simulate):
+    return template.clock.read()[0]
+
+
+class TestEnsemble(TestCase):
+
+    def test_run_replicate(self):
+        seed, stats = run_replicate(CountingTemplate, run_statistics, 0, 7)
+        self.assertEqual(7, seed, "Incorrect seed returned")
+        self.assertTrue(stats["terminated"], "Replicate did not run to termination")
+
+    def test_run(self):
+        ensemble = Ensemble(CountingTemplate, clock_summary, workers=2)
+        results = dict(ensemble.run(range(10)))
+        self.assertEqual(set(range(10)), set(results.keys()), "Not all replicates returned")
+        for seed, clock in results.items():
+            self.assertEqual(run_replicate(CountingTemplate, clock_summary, 0, seed)[1], clock,
+                             "Replicate not reproducible from its seed")
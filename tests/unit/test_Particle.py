@@ -0,0 +1,62 @@
+import pickle
+import sys
+from unittest import TestCase
+
+import networkx as nx
+import numpy as np
+
+from metachem import CoreContainer
+from metachem.Particle import CompactParticle, Particle, ParticleArray, column_property
+
+
+class DictParticle(Particle):
+    pass
+
+
+class SpeedParticle(CompactParticle):
+    __slots__ = ()
+    speed = column_property("speed")
+
+
+class TestParticleArray(TestCase):
+
+    def test_handles(self):
+        store = ParticleArray(capacity=2)
+        particles = [store.new(id=i, atom=i % 2 == 0) for i in range(5)]
+        self.assertEqual(5, len(store), "Store size not counted")
+        self.assertEqual(3, particles[3].id, "Id not read from store")
+        self.assertTrue(particles[2].atom, "Atom flag not read from store")
+        self.assertIsNone(particles[1].location, "Unset location not None")
+        particles[1].location = (1, 2)
+        self.assertEqual([1, 2], list(store.column("locations")[1]), "Location not written to store")
+        self.assertEqual(particles[4], store[4], "Handles on the same row not equal")
+        self.assertFalse(hasattr(particles[0], "__dict__"), "Compact particle has an instance dictionary")
+        self.assertLess(sys.getsizeof(particles[0]), sys.getsizeof(DictParticle()), "Compact particle not smaller")
+
+    def test_location_copy(self):
+        store = ParticleArray(capacity=1)
+        particle = store.new(location=(1, 2))
+        location = particle.location
+        store.new(location=(3, 4))
+        particle.location = (5, 6)
+        self.assertEqual([1, 2], list(location), "Location changed through the store")
+        self.assertEqual([5, 6], list(particle.location), "Location not read after grow")
+
+    def test_fields(self):
+        store = ParticleArray(fields={"speed": float}, particle_type=SpeedParticle)
+        particle = store.new(speed=1.5)
+        particle.speed = particle.speed * 2
+        self.assertEqual([3.0], list(store.column("speed")), "Extra field not stored")
+
+    def test_containers(self):
+        store = ParticleArray()
+        graph = nx.DiGraph()
+        tank = CoreContainer.ListTank(graph, indexed=True)
+        particles = [store.new(id=i) for i in range(10)]
+        tank.add(particles)
+        tank.remove([store[3], store[7]])
+        self.assertEqual(8, len(tank), "Particles not removed from tank")
+        self.assertNotIn(particles[3], tank.read(), "Wrong particle removed")
+        copied = pickle.loads(pickle.dumps(tank.read()))
+        self.assertIs(copied[0].store, copied[1].store, "Store not shared after pickling")
+        self.assertTrue(np.array_equal([0, 1, 2, 4, 5, 6, 8, 9], sorted(p.id for p in copied)), "Ids lost by pickle")
@@ -0,0 +1,30 @@
+import random
+from unittest import TestCase
+
+from metachem import ParticleFactory
+
+
+class IntFactory(ParticleFactory):
+
+    def createParticle(self, seed=None):
+        super(IntFactory, self).createParticle(seed)
+        return random.randint(0, 10 ** 6)
+
+
+class TestParticleFactory(TestCase):
+
+    def test_chunks_deterministic(self):
+        serial = IntFactory().createParticles(10, seed=3, chunk_size=3)
+        self.assertEqual(10, len(serial), "Wrong number of particles")
+        self.assertEqual(serial, IntFactory().createParticles(10, seed=3, chunk_size=3), "Serial chunks not repeatable")
+        pooled = IntFactory().createParticles(10, seed=3, workers=2, chunk_size=3)
+        self.assertEqual(serial, pooled, "Pool chunks differ from serial chunks")
+        self.assertEqual(pooled, IntFactory().createParticles(10, seed=3, workers=2, chunk_size=3),
+                         "Pool chunks not repeatable")
+
+    def test_chunks_leave_random(self):
+        random.seed(2)
+        expected = random.random()
+        random.seed(2)
+        IntFactory().createParticles(6, seed=4, chunk_size=3)
+        self.assertEqual(expected, random.random(), "Chunked creation changed the global random state")
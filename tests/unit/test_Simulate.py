@@ -0,0 +1,298 @@
+import os
+import random
+import tempfile
+from unittest import TestCase
+
+import networkx as nx
+
+from metachem import CoreContainer, CoreControl, CoreNode
+from metachem.Simulate import Simulate, TERMINATION, DECISION, CONTROL
+
+
+class CoinClockObserver(CoreControl.ClockObserver):
+    """
+    Clock which only ticks on half of its transitions.
+    """
+
+    def check(self):
+        return 0.5
+
+
+class HalfClockObserver(CoreControl.ClockObserver):
+    """
+    Clock which declares a constant chance of ticking on half of its transitions.
+    """
+    firing_probability = 0.5
+
+
+class LogObserver(CoreNode.Observer):
+    """
+    Logs the clock value to a log environment.
+    """
+
+    def read(self):
+        self.value = self.containersin.peek(0)
+
+    def pull(self):
+        pass
+
+    def process(self):
+        pass
+
+    def push(self):
+        self.containersout.add({"time": self.value})
+
+
+def logging_graph(directory, threshold=10):
+    """
+    Counting loop which logs every clock value to a DiskLogEnvironment in directory, two rows per chunk.
+    """
+    graph, otime, dcount, tterm, VTime = counting_graph(threshold)
+    VLog = CoreContainer.DiskLogEnvironment(graph, directory, ["time"], chunk_size=2, mode="append")
+    olog = LogObserver(graph, VTime, VLog)
+    graph.remove_edge(otime, dcount)
+    graph.add_edge(otime, olog)
+    graph.add_edge(olog, dcount)
+    return graph, otime, VLog
+
+
+def counting_graph(threshold=5, clock=CoreControl.ClockObserver):
+    """
+    Builds a loop which increments a clock, starting from 1, until it reaches the threshold and then terminates.
+    """
+    graph = nx.DiGraph()
+    VTime = CoreContainer.ListEnvironment(graph)
+    VTime.add(1)
+    otime = clock(graph, VTime, VTime)
+    dcount = CoreControl.CounterDecision(graph, 2, VTime, threshold)
+    tterm = CoreNode.Termination(graph)
+    for edge in [[otime, dcount], [dcount, otime], [dcount, tterm]]:
+        graph.add_edge(edge[0], edge[1])
+    return graph, otime, dcount, tterm, VTime
+
+
+class TestCompileGraph(TestCase):
+
+    def test_compile_graph(self):
+        graph, otime, dcount, tterm, VTime = counting_graph()
+        sim = Simulate(graph, otime)
+        self.assertEqual([otime, dcount, tterm], sim.plan_nodes, "Control nodes not indexed in order found")
+        self.assertEqual([(1,), (0, 2), ()], sim.plan_successors, "Incorrect successor table")
+        self.assertEqual([CONTROL, DECISION, TERMINATION], sim.plan_kinds, "Incorrect node kinds")
+
+    def test_run_graph(self):
+        graph, otime, dcount, tterm, VTime = counting_graph(5)
+        sim = Simulate(graph, otime)
+        sim.run_graph()
+        self.assertEqual([5], VTime.read(), "Did not run to termination")
+
+    def test_run_graph_counter(self):
+        graph = nx.DiGraph()
+        VTime = CoreContainer.CounterEnvironment(graph, 0)
+        otime = CoreControl.ClockObserver(graph, VTime, VTime)
+        dcount = CoreControl.CounterDecision(graph, 2, VTime, 5)
+        tterm = CoreNode.Termination(graph)
+        for edge in [[otime, dcount], [dcount, otime], [dcount, tterm]]:
+            graph.add_edge(edge[0], edge[1])
+        Simulate(graph, otime).run_graph()
+        self.assertEqual(5, VTime.get(), "Counter clock did not count to threshold")
+
+    def test_run_graph_transition_limit(self):
+        graph, otime, dcount, tterm, VTime = counting_graph(100)
+        sim = Simulate(graph, otime)
+        sim.run_graph(transition_limit=4)
+        self.assertEqual([4], VTime.read(), "Transition limit not respected")
+
+
+class TestCheckGraph(TestCase):
+
+    def test_check_graph(self):
+        graph, otime, dcount, tterm, VTime = counting_graph()
+        sim = Simulate(graph, otime)
+        self.assertTrue(sim.check_graph(), "Valid graph failed check")
+        self.assertEqual([], sim.dead_ends, "Incorrect dead ends found")
+        self.assertEqual([], sim.unreachable, "Incorrect unreachable nodes found")
+
+    def test_dead_ends(self):
+        graph, otime, dcount, tterm, VTime = counting_graph()
+        graph.remove_node(tterm)
+        VGen = CoreContainer.ListEnvironment(graph)
+        VGen.add(1)
+        ogen = CoreControl.ClockObserver(graph, VGen, VGen)
+        graph.add_edge(dcount, ogen)
+        with self.assertRaises(Warning) as context:
+            Simulate(graph, otime)
+        self.assertIn("ClockObserver(" + str(ogen.id) + ")", str(context.exception), "Dead end not reported")
+
+    def test_unreachable(self):
+        graph, otime, dcount, tterm, VTime = counting_graph()
+        VGen = CoreContainer.ListEnvironment(graph)
+        ogen = CoreControl.ClockObserver(graph, VGen, VGen)
+        graph.add_edge(ogen, tterm)
+        with self.assertWarns(UserWarning):
+            sim = Simulate(graph, otime)
+        self.assertEqual([ogen], sim.unreachable, "Unreachable node not reported")
+
+
+class TestRunFast(TestCase):
+
+    def test_run_fast(self):
+        graph, otime, dcount, tterm, VTime = counting_graph(5)
+        sim = Simulate(graph, otime)
+        stats = sim.run_fast()
+        self.assertEqual([5], VTime.read(), "Did not run to termination")
+        self.assertEqual({"transitions": 8, "terminated": True}, stats, "Incorrect run statistics")
+
+    def test_run_fast_repeated(self):
+        graph, otime, dcount, tterm, VTime = counting_graph(100)
+        sim = Simulate(graph, otime)
+        stats = sim.run_fast(4, chunk_size=3)
+        self.assertEqual({"transitions": 4, "terminated": False}, stats, "Incorrect run statistics")
+        self.assertEqual([3], VTime.read(), "Incorrect number of transitions executed")
+        sim.run_fast(4)
+        self.assertEqual([5], VTime.read(), "Did not continue from previous position")
+        self.assertEqual(8, sim.transitions, "Transition count not kept between calls")
+
+
+class TestProfile(TestCase):
+
+    def test_profile_table(self):
+        graph, otime, dcount, tterm, VTime = counting_graph(5)
+        sim = Simulate(graph, otime, profile=True)
+        sim.run_graph()
+        self.assertEqual([5], VTime.read(), "Profiled run did not run to termination")
+        table = sim.profile_table()
+        self.assertEqual([4, 4, 0], list(table["calls"]), "Incorrect call counts")
+        self.assertEqual([0, 0, 0], list(table["gated"]), "Incorrect gated counts")
+        self.assertTrue((table["total"] >= 0).all(), "Negative stage timings")
+
+    def test_profile_disabled(self):
+        graph, otime, dcount, tterm, VTime = counting_graph(5)
+        sim = Simulate(graph, otime)
+        sim.run_graph()
+        self.assertEqual([], sim.profile_stats, "Profile recorded without being requested")
+
+
+class TestSeed(TestCase):
+
+    def test_seeded_run(self):
+        graph, otime, dcount, tterm, VTime = counting_graph(1000, CoinClockObserver)
+        Simulate(graph, otime, seed=11).run_fast(200)
+        expected = VTime.read()
+        graph, otime, dcount, tterm, VTime = counting_graph(1000, CoinClockObserver)
+        random.seed(5)
+        Simulate(graph, otime, seed=11).run_fast(200)
+        self.assertEqual(expected, VTime.read(), "Seeded runs not reproducible")
+
+    def test_independent_streams(self):
+        graph, otime, dcount, tterm, VTime = counting_graph()
+        Simulate(graph, otime, seed=11)
+        self.assertIsNot(otime.rng, dcount.rng, "Control nodes share a stream")
+        self.assertNotEqual(otime.rng.random(), dcount.rng.random(), "Control node streams not independent")
+
+
+class TestFiringProbability(TestCase):
+
+    def test_firing_probability(self):
+        self.assertEqual(1.0, CoreControl.ClockObserver.firing_probability, "Observer not declared deterministic")
+        self.assertIsNone(CoinClockObserver.firing_probability, "Overridden check not detected")
+        self.assertEqual(0.5, HalfClockObserver.firing_probability, "Declared probability not kept")
+
+    def test_constant_probability(self):
+        graph, otime, dcount, tterm, VTime = counting_graph(100000, HalfClockObserver)
+        Simulate(graph, otime, seed=3).run_fast(20000)
+        self.assertTrue(4000 < VTime.read()[0] < 6000, "Clock did not tick on about half of its transitions")
+        self.assertTrue(otime.uniforms, "Uniform buffer not used")
+        graph, otime, dcount, tterm, repeat = counting_graph(100000, HalfClockObserver)
+        Simulate(graph, otime, seed=3).run_fast(20000)
+        self.assertEqual(VTime.read(), repeat.read(), "Buffered draws not reproducible")
+
+
+class TestCheckpoint(TestCase):
+
+    def test_checkpoint_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.checkpoint")
+            graph, otime, dcount, tterm, VTime = counting_graph(10)
+            sim = Simulate(graph, otime)
+            sim.run_fast(5)
+            random.seed(3)
+            expected = random.random()
+            random.seed(3)
+            sim.checkpoint(path)
+            graph, otime, dcount, tterm, VTime = counting_graph(10)
+            resumed = Simulate(graph, otime)
+            resumed.resume(path)
+            self.assertEqual([4], VTime.read(), "Container contents not restored")
+            self.assertEqual(5, resumed.transitions, "Transition count not restored")
+            self.assertEqual(expected, random.random(), "Random state not restored")
+            resumed.run_fast()
+            self.assertEqual([10], VTime.read(), "Did not continue run from checkpoint")
+
+    def test_checkpoint_streams(self):
+        for clock in [CoinClockObserver, HalfClockObserver]:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "run.checkpoint")
+                graph, otime, dcount, tterm, VTime = counting_graph(1000, clock)
+                sim = Simulate(graph, otime, seed=11)
+                sim.run_fast(50)
+                sim.checkpoint(path)
+                sim.run_fast(50)
+                expected = VTime.read()
+                graph, otime, dcount, tterm, VTime = counting_graph(1000, clock)
+                resumed = Simulate(graph, otime)
+                resumed.resume(path)
+                resumed.run_fast(50)
+                self.assertEqual(expected, VTime.read(), "Node streams not restored for " + clock.__name__)
+
+    def test_checkpoint_every(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.checkpoint")
+            graph, otime, dcount, tterm, VTime = counting_graph(10)
+            sim = Simulate(graph, otime, checkpoint_path=path, checkpoint_every=6)
+            sim.run_graph()
+            self.assertEqual([10], VTime.read(), "Checkpointed run did not run to termination")
+            graph, otime, dcount, tterm, VTime = counting_graph(10)
+            resumed = Simulate(graph, otime)
+            resumed.resume(path)
+            self.assertEqual(12, resumed.transitions, "Last checkpoint not written at correct transition")
+            self.assertEqual([7], VTime.read(), "Incorrect contents in automatic checkpoint")
+
+    def test_resume_log(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.checkpoint")
+            log_path = os.path.join(directory, "log")
+            graph, otime, VLog = logging_graph(os.path.join(directory, "full"))
+            Simulate(graph, otime).run_fast()
+            VLog.close()
+            expected = list(VLog.read()[:]["time"])
+            graph, otime, VLog = logging_graph(log_path)
+            sim = Simulate(graph, otime)
+            sim.run_fast(4)
+            sim.checkpoint(path)
+            sim.run_fast(5)
+            VLog.close()
+            graph, otime, VLog = logging_graph(log_path)
+            resumed = Simulate(graph, otime)
+            resumed.resume(path)
+            resumed.run_fast()
+            VLog.close()
+            self.assertEqual(len(expected), len(VLog.read()), "Log rows written after the checkpoint kept")
+            self.assertEqual(expected, list(VLog.read()[:]["time"]), "Resumed log differs from uninterrupted run")
+
+    def test_run_graph_resume(self):
+        for profile in [False, True]:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "run.checkpoint")
+                graph, otime, dcount, tterm, VTime = counting_graph(10)
+                Simulate(graph, otime, profile=profile, checkpoint_path=path, checkpoint_every=6).run_graph()
+                graph, otime, dcount, tterm, VTime = counting_graph(10)
+                resumed = Simulate(graph, otime, profile=profile, checkpoint_path=path, checkpoint_every=4)
+                resumed.resume(path)
+                resumed.run_graph()
+                self.assertEqual([10], VTime.read(), "Resumed run_graph did not continue to termination")
+                self.assertTrue(resumed.terminated, "Resumed run not terminated")
+                graph, otime, dcount, tterm, VTime = counting_graph(10)
+                Simulate(graph, otime).resume(path)
+                self.assertEqual([9], VTime.read(), "Checkpoint not written after resume")
+
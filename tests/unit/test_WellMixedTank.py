@@ -1,6 +1,8 @@
+import random
 from unittest import TestCase
 
 import networkx as nx
+import numpy as np
 
 from metachem.templates.WellMixedTank import LoadSampler, TimingsDecision
 from metachem import CoreContainer, CoreNode
@@ -31,6 +33,23 @@ class TestLoadSampler(TestCase):
         sload.pull()
         self.assertEqual(1000, len(sload.sample), "Did not generate full tank of int particles")
 
+    def test_pull_rbn(self):
+        def tank(seed, rng=None):
+            np.random.seed(seed)
+            graph = nx.DiGraph()
+            sload = LoadSampler(graph, CoreContainer.ListTank(graph), tank_size=3, load_type="RBN")
+            if rng is not None:
+                sload.rng = rng
+            sload.pull()
+            return [particle.atoms[0].compileWiring()[1].tolist() for particle in sload.sample]
+
+        random.seed(1)
+        first = tank(5)
+        random.seed(2)
+        self.assertEqual(first, tank(5), "Unseeded RBN tank not taken from the global numpy state")
+        self.assertNotEqual(first, tank(6), "Unseeded RBN tank ignores the global numpy state")
+        self.assertEqual(tank(5, random.Random(3)), tank(6, random.Random(3)), "Node stream not used for RBN tank")
+
     def test_push(self):
         graph = nx.DiGraph()
         TTank = CoreContainer.ListTank(graph)